@@ -1,6 +1,11 @@
 import re, csv, os
-import logging
-from typing import List, Optional, Tuple, Union
+import argparse, logging, mmap
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple, Union
+from common.parallel import bounded_map
+
+EMAIL_PATTERN = re.compile(r'([A-Za-z0-9]+)@([A-Za-z0-9]+)\.([A-Za-z0-9]+)')
+DEFAULT_BLOCK_SIZE = 64 * 1024 * 1024
 
     
 class Task:
@@ -8,7 +13,7 @@ class Task:
     def read(self, file_name: str) -> Union[List[str], Exception]:
         datas = []
         try:
-            with open('./in.txt','r') as fs:
+            with open(file_name,'r') as fs:
                 datas = [line.rstrip('\n') for line in fs] 
         except FileNotFoundError as e:
             logging.error(f"File not found: {file_name}")
@@ -21,11 +26,10 @@ class Task:
     def process(self, datas: Optional[List[str]]) -> List[List[str]]:
         if datas is None:
             return []
-        email_pattern = re.compile(r'([A-Za-z0-9]+)@([A-Za-z0-9]+)\.([A-Za-z0-9]+)')
         processes_data = []
         incorrect_data = []
         for data in datas:
-            matcher = re.search(email_pattern, data)
+            matcher = EMAIL_PATTERN.search(data)
             if matcher is not None:
                 p1, p2, p3 = matcher.groups()
                 processes_data.append([p1,p2,p3])
@@ -43,6 +47,67 @@ class Task:
             logging.error(f"File not found: {file_name}. Error: {e}")
         except IOError as e:
             logging.error(f"IOError occurred while reading the file: {file_name}. Error: {e}")
+
+
+def iter_blocks(file_name: str, block_size: int) -> Iterator[Tuple[int, int]]:
+    """Yields (start, end) byte ranges of roughly block_size that end on a line boundary."""
+    size = os.path.getsize(file_name)
+    if size == 0:
+        return
+    with open(file_name, 'rb') as fs, mmap.mmap(fs.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = 0
+        while start < size:
+            newline = mm.find(b'\n', min(start + block_size, size) - 1)
+            end = size if newline == -1 else newline + 1
+            yield start, end
+            start = end
+
+def process_block(file_name: str, start: int, end: int) -> Tuple[List[Tuple[str, str, str]], List[str]]:
+    """Matches every line of a byte range, returning (p1, p2, p3) rows and the rejected lines."""
+    with open(file_name, 'rb') as fs, mmap.mmap(fs.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        text = mm[start:end].decode('utf-8', errors='replace')
+    lines = text.split('\n')
+    if lines and lines[-1] == '':
+        lines.pop()
+    processes_data = []
+    incorrect_data = []
+    for line in lines:
+        line = line.rstrip('\r')
+        matcher = EMAIL_PATTERN.search(line)
+        if matcher is not None:
+            processes_data.append(matcher.groups())
+        else:
+            incorrect_data.append(line)
+    return processes_data, incorrect_data
+
+def run_streaming_task(input_file: str, output_file: str, reject_file: Optional[str] = None,
+                       workers: Optional[int] = None, block_size: int = DEFAULT_BLOCK_SIZE) -> Tuple[int, int]:
+    """
+    Processes input_file block by block across a process pool, writing results in input order.
+
+    At most 2 * workers blocks are in flight, so memory is bounded by the block size rather
+    than the file size. Returns the number of (matched, rejected) lines.
+    """
+    workers = workers or os.cpu_count() or 1
+    matched = rejected = 0
+    try:
+        with open(output_file, mode='w', newline='') as out, \
+                (open(reject_file, mode='w') if reject_file else open(os.devnull, mode='w')) as rejects, \
+                ProcessPoolExecutor(max_workers=workers) as executor:
+            writer = csv.writer(out, delimiter=';')
+            writer.writerow(['p1', 'p2', 'p3'])
+            blocks = ((input_file, start, end) for start, end in iter_blocks(input_file, block_size))
+            for processes_data, incorrect_data in bounded_map(executor, process_block, blocks, 2 * workers):
+                writer.writerows(processes_data)
+                rejects.writelines(line + '\n' for line in incorrect_data)
+                matched += len(processes_data)
+                rejected += len(incorrect_data)
+    except FileNotFoundError as e:
+        logging.error(f"File not found: {e.filename}. Error: {e}")
+    except IOError as e:
+        logging.error(f"IOError occurred while processing the file: {input_file}. Error: {e}")
+    logging.info(f"Matched {matched} lines, rejected {rejected} lines")
+    return matched, rejected
         
             
 def run_task():
@@ -57,6 +122,18 @@ def run_task():
             
     
 if __name__ == '__main__':
-    run_task()
+    parser = argparse.ArgumentParser(description="Split email addresses into p1;p2;p3 CSV rows.")
+    parser.add_argument('--stream', action='store_true', help="Use the block-parallel streaming engine")
+    parser.add_argument('--input', default='./in.txt', help="Input file (with --stream)")
+    parser.add_argument('--output', default='./out.csv', help="Output CSV file (with --stream)")
+    parser.add_argument('--reject', help="File receiving lines without an email (with --stream)")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: all cores)")
+    parser.add_argument('--block-size', type=int, default=DEFAULT_BLOCK_SIZE, help="Bytes per block")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.stream:
+        run_streaming_task(args.input, args.output, args.reject, args.workers, args.block_size)
+    else:
+        run_task()
 
     
\ No newline at end of file
@@ -0,0 +1 @@
+"""Helpers shared by the pandas, dask, sqlite and file_transfer scripts."""
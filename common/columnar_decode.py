@@ -0,0 +1,42 @@
+import functools
+import orjson
+import pandas as pd
+import pyarrow as pa
+from typing import Any, Callable, Dict, Optional
+
+POSTS_SCHEMA = pa.schema([
+    ('userId', pa.int32()),
+    ('id', pa.int32()),
+    ('title', pa.string()),
+    ('body', pa.string()),
+])
+
+def to_pandas(table: pa.Table) -> pd.DataFrame:
+    """Converts to pandas keeping string columns Arrow-backed (string[pyarrow])."""
+    return table.to_pandas(
+        types_mapper={pa.string(): pd.StringDtype('pyarrow'), pa.large_string(): pd.StringDtype('pyarrow')}.get,
+        split_blocks=True,
+        self_destruct=True
+    )
+
+def decode_columns(payload: bytes, schema: pa.Schema = POSTS_SCHEMA,
+                   equals: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+    """
+    Decodes a JSON array of records straight into typed Arrow columns.
+
+    Records not matching every `equals` condition are dropped before any column is
+    built, and no dtype inference happens: each field is converted to its schema type.
+    """
+    records = orjson.loads(payload)
+    if equals:
+        records = [record for record in records if all(record.get(key) == value for key, value in equals.items())]
+    if not records:
+        return to_pandas(schema.empty_table())
+    columns = [pa.array([record.get(field.name) for record in records], type=field.type) for field in schema]
+    del records
+    return to_pandas(pa.Table.from_arrays(columns, schema=schema))
+
+def columnar_decoder(schema: pa.Schema = POSTS_SCHEMA,
+                     equals: Optional[Dict[str, Any]] = None) -> Callable[[bytes], pd.DataFrame]:
+    """Returns a page decoder for common.http_fetch bound to a schema and filter."""
+    return functools.partial(decode_columns, schema=schema, equals=equals)
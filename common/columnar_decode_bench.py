@@ -0,0 +1,45 @@
+import argparse, json, logging, time, tracemalloc
+import orjson
+import pandas as pd
+import pyarrow as pa
+from common.columnar_decode import decode_columns
+from common.http_fetch_test import make_posts
+
+def decode_dicts(payload: bytes) -> pd.DataFrame:
+    """The previous path: json into Python dicts, DataFrame with dtype inference, then filter."""
+    df = pd.DataFrame(json.loads(payload))
+    return df[df['userId'] == 1]
+
+def measure(name: str, decode, payload: bytes) -> None:
+    pool = pa.default_memory_pool()
+    arrow_before = pool.bytes_allocated()
+    tracemalloc.start()
+    start_time = time.time()
+    df = decode(payload)
+    elapsed = time.time() - start_time
+    _, python_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    arrow_bytes = pool.bytes_allocated() - arrow_before
+    logging.info(
+        f"{name}: {len(df)} rows in {elapsed:.3f} seconds, "
+        f"peak Python heap {python_peak / 2**20:.1f} MiB, Arrow buffers {arrow_bytes / 2**20:.1f} MiB, "
+        f"dtypes {dict(df.dtypes.astype(str))}"
+    )
+
+def run_benchmark(rows: int, users: int) -> None:
+    posts = make_posts(rows)
+    for post in posts:
+        post['userId'] = post['id'] % users + 1
+    payload = orjson.dumps(posts)
+    del posts
+    logging.info(f"Payload: {len(payload) / 2**20:.1f} MiB, {rows} records")
+    measure('json + pd.DataFrame', decode_dicts, payload)
+    measure('orjson + pinned Arrow schema', lambda p: decode_columns(p, equals={'userId': 1}), payload)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare dict-based and columnar decoding of a posts payload.")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="Records in the synthetic payload")
+    parser.add_argument('--users', type=int, default=10, help="Distinct userId values (filter keeps one)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    run_benchmark(args.rows, args.users)
@@ -0,0 +1,128 @@
+import asyncio, json, logging, time
+import aiohttp
+import pandas as pd
+import requests
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+@dataclass(frozen=True)
+class FetchConfig:
+    """Configuration for the paginated fetcher."""
+    page_size: int = 100
+    concurrency: int = 8
+    timeout: float = 30.0
+    retries: int = 3
+    backoff: float = 0.5
+    max_pages: Optional[int] = None
+    headers: Optional[Dict[str, str]] = None
+
+class FetchError(RuntimeError):
+    """Raised when a page cannot be fetched after all retries."""
+
+def decode_json(payload: bytes) -> pd.DataFrame:
+    """Default page decoder: JSON array of records into a DataFrame."""
+    data = json.loads(payload)
+    return pd.DataFrame(data) if data else pd.DataFrame()
+
+def page_params(page: int, config: FetchConfig) -> Dict[str, int]:
+    return {'_page': page, '_limit': config.page_size}
+
+async def fetch_page(session: aiohttp.ClientSession, url: str, page: int, config: FetchConfig,
+                     semaphore: asyncio.Semaphore) -> Tuple[int, bytes, Optional[int]]:
+    """Fetches one page, retrying transient failures with exponential backoff."""
+    for attempt in range(config.retries + 1):
+        delay = config.backoff * 2 ** attempt
+        try:
+            async with semaphore:
+                async with session.get(url, params=page_params(page, config)) as response:
+                    if response.status in RETRY_STATUSES and attempt < config.retries:
+                        retry_after = response.headers.get('Retry-After')
+                        if retry_after is not None and retry_after.isdigit():
+                            delay = max(delay, float(retry_after))
+                        logging.warning(f"page {page}: status {response.status}, retrying in {delay:.2f}s")
+                    else:
+                        response.raise_for_status()
+                        total = response.headers.get('X-Total-Count')
+                        return page, await response.read(), int(total) if total is not None else None
+        except aiohttp.ClientResponseError as e:
+            raise FetchError(f"page {page}: HTTP {e.status} {e.message}") from e
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if attempt == config.retries:
+                raise FetchError(f"page {page}: {e!r}") from e
+            logging.warning(f"page {page}: {e!r}, retrying in {delay:.2f}s")
+        await asyncio.sleep(delay)
+    raise FetchError(f"page {page}: retries exhausted")
+
+async def iter_pages(url: str, config: FetchConfig = FetchConfig(),
+                     decode: Callable[[bytes], pd.DataFrame] = decode_json) -> AsyncIterator[pd.DataFrame]:
+    """
+    Yields one DataFrame per page as pages arrive (not necessarily in page order).
+
+    The first page is fetched alone; if the server reports X-Total-Count the remaining
+    pages are scheduled at once, otherwise they are fetched in windows of `concurrency`
+    pages until a short page is seen.
+    """
+    semaphore = asyncio.Semaphore(config.concurrency)
+    connector = aiohttp.TCPConnector(limit=config.concurrency, keepalive_timeout=30)
+    timeout = aiohttp.ClientTimeout(total=config.timeout)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=config.headers) as session:
+        _, payload, total = await fetch_page(session, url, 1, config, semaphore)
+        first = decode(payload)
+        if not first.empty:
+            yield first
+        if len(first) < config.page_size:
+            return
+        last_page = config.max_pages or float('inf')
+        if total is not None:
+            last_page = min(last_page, -(-total // config.page_size))
+        next_page = 2
+        while next_page <= last_page:
+            window_end = last_page if total is not None else min(last_page, next_page + config.concurrency - 1)
+            pages = range(next_page, int(window_end) + 1)
+            tasks = [asyncio.create_task(fetch_page(session, url, page, config, semaphore)) for page in pages]
+            exhausted = False
+            try:
+                for completed in asyncio.as_completed(tasks):
+                    page, payload, _ = await completed
+                    df = decode(payload)
+                    exhausted |= len(df) < config.page_size
+                    if not df.empty:
+                        yield df
+            finally:
+                for task in tasks:
+                    task.cancel()
+            if exhausted:
+                return
+            next_page = int(window_end) + 1
+
+async def collect_pages(url: str, config: FetchConfig = FetchConfig(),
+                        decode: Callable[[bytes], pd.DataFrame] = decode_json) -> List[pd.DataFrame]:
+    return [batch async for batch in iter_pages(url, config, decode)]
+
+def fetch_dataframe(url: str, config: FetchConfig = FetchConfig(),
+                    decode: Callable[[bytes], pd.DataFrame] = decode_json) -> pd.DataFrame:
+    """Synchronous entry point: fetches every page concurrently and concatenates them."""
+    start_time = time.time()
+    batches = asyncio.run(collect_pages(url, config, decode))
+    df = pd.concat(batches, ignore_index=True) if batches else pd.DataFrame()
+    logging.info(f"Fetched {len(df)} rows in {len(batches)} pages in {time.time() - start_time:.2f} seconds")
+    return df
+
+def fetch_dataframe_sequential(url: str, config: FetchConfig = FetchConfig(),
+                               decode: Callable[[bytes], pd.DataFrame] = decode_json) -> pd.DataFrame:
+    """Baseline: one blocking request per page, used for benchmarking."""
+    batches = []
+    page = 1
+    with requests.Session() as session:
+        while config.max_pages is None or page <= config.max_pages:
+            response = session.get(url, params=page_params(page, config), timeout=config.timeout)
+            response.raise_for_status()
+            df = decode(response.content)
+            if not df.empty:
+                batches.append(df)
+            if len(df) < config.page_size:
+                break
+            page += 1
+    return pd.concat(batches, ignore_index=True) if batches else pd.DataFrame()
@@ -0,0 +1,28 @@
+import argparse, logging, time
+from common.http_fetch import FetchConfig, fetch_dataframe, fetch_dataframe_sequential
+from common.http_fetch_test import make_posts, posts_handler
+from common.stub_server import start_stub_server
+
+def run_benchmark(rows: int, page_size: int, concurrency: int, latency: float) -> None:
+    server, url, _ = start_stub_server(posts_handler, posts=make_posts(rows), latency=latency)
+    url = f'{url}/posts'
+    config = FetchConfig(page_size=page_size, concurrency=concurrency)
+    try:
+        for name, fetch in (('sequential', fetch_dataframe_sequential), (f'async x{concurrency}', fetch_dataframe)):
+            start_time = time.time()
+            df = fetch(url, config)
+            elapsed = time.time() - start_time
+            logging.info(f"{name}: {len(df)} rows in {elapsed:.2f} seconds ({len(df) / elapsed:,.0f} rows/sec)")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare sequential and concurrent paginated fetching against a local stub.")
+    parser.add_argument('--rows', type=int, default=100_000, help="Records served by the stub")
+    parser.add_argument('--page-size', type=int, default=500, help="Records per page (_limit)")
+    parser.add_argument('--concurrency', type=int, default=16, help="Concurrent requests")
+    parser.add_argument('--latency', type=float, default=0.05, help="Injected server latency per request, in seconds")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    run_benchmark(args.rows, args.page_size, args.concurrency, args.latency)
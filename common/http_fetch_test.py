@@ -0,0 +1,78 @@
+import unittest, json, logging, time
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from common.stub_server import StubServerTestCase
+from common.http_fetch import FetchConfig, FetchError, fetch_dataframe, fetch_dataframe_sequential
+
+def make_posts(rows: int):
+    return [{'userId': i % 10 + 1, 'id': i, 'title': f'title {i}', 'body': f'body {i}'} for i in range(1, rows + 1)]
+
+def posts_handler(posts, latency: float = 0.0, failures: int = 0, total_header: bool = True):
+    """Serves posts with json-server style ?_page=&_limit= pagination."""
+    state = {'failures': failures, 'requests': 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            state['requests'] += 1
+            if latency:
+                time.sleep(latency)
+            if state['failures'] > 0:
+                state['failures'] -= 1
+                self.send_response(503)
+                self.send_header('Retry-After', '0')
+                self.end_headers()
+                return
+            query = parse_qs(urlparse(self.path).query)
+            page = int(query.get('_page', ['1'])[0])
+            limit = int(query.get('_limit', [str(len(posts))])[0])
+            body = json.dumps(posts[(page - 1) * limit:page * limit]).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            if total_header:
+                self.send_header('X-Total-Count', str(len(posts)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler, state
+
+class TestHttpFetch(StubServerTestCase):
+
+    def start_posts_server(self, posts, **options):
+        url, state = self.start_stub_server(posts_handler, posts=posts, **options)
+        return f'{url}/posts', state
+
+    def test_fetches_all_pages_with_total_count(self):
+        url, state = self.start_posts_server(make_posts(250))
+        df = fetch_dataframe(url, FetchConfig(page_size=20, concurrency=4))
+        self.assertEqual(sorted(df['id']), list(range(1, 251)))
+        self.assertEqual(state['requests'], 13)
+
+    def test_fetches_in_windows_without_total_count(self):
+        url, _ = self.start_posts_server(make_posts(95), total_header=False)
+        df = fetch_dataframe(url, FetchConfig(page_size=10, concurrency=3))
+        self.assertEqual(sorted(df['id']), list(range(1, 96)))
+
+    def test_matches_sequential_fetch(self):
+        url, _ = self.start_posts_server(make_posts(57))
+        config = FetchConfig(page_size=10)
+        concurrent = fetch_dataframe(url, config).sort_values('id').reset_index(drop=True)
+        sequential = fetch_dataframe_sequential(url, config)
+        self.assertTrue(concurrent.equals(sequential))
+
+    def test_retries_transient_errors(self):
+        url, _ = self.start_posts_server(make_posts(10), failures=2)
+        df = fetch_dataframe(url, FetchConfig(page_size=10, backoff=0.01))
+        self.assertEqual(len(df), 10)
+
+    def test_raises_after_retries_exhausted(self):
+        url, _ = self.start_posts_server(make_posts(10), failures=5)
+        with self.assertRaises(FetchError):
+            fetch_dataframe(url, FetchConfig(page_size=10, retries=2, backoff=0.01))
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    unittest.main()
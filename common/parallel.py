@@ -0,0 +1,21 @@
+from collections import deque
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Deque, Iterable, Iterator, Tuple, TypeVar
+
+T = TypeVar('T')
+
+def bounded_map(executor: Executor, fn: Callable[..., T], arguments: Iterable[Tuple[Any, ...]],
+                max_in_flight: int) -> Iterator[T]:
+    """
+    Calls fn(*args) on the executor for each tuple in arguments and yields the results in input
+    order. Unlike Executor.map, arguments are consumed lazily: at most max_in_flight calls are
+    pending at once, so reading a large input keeps pace with the workers instead of running
+    ahead and buffering it all.
+    """
+    pending: Deque[Future] = deque()
+    for args in arguments:
+        pending.append(executor.submit(fn, *args))
+        if len(pending) >= max_in_flight:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
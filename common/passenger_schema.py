@@ -0,0 +1,57 @@
+import pyarrow as pa
+from typing import Any, Dict, List, Optional
+
+PASSENGER_DTYPES: Dict[str, str] = {
+    'PassengerId': 'int32',
+    'Survived': 'int8',
+    'Pclass': 'int8',
+    'Name': 'string[pyarrow]',
+    'Sex': 'category',
+    'Age': 'float32',
+    'SibSp': 'int8',
+    'Parch': 'int8',
+    'Ticket': 'string[pyarrow]',
+    'Fare': 'float32',
+    'Cabin': 'string[pyarrow]',
+    'Embarked': 'category',
+}
+
+# Arrow type of each pandas dtype above, for writers that need a schema before any data
+ARROW_TYPES: Dict[str, pa.DataType] = {
+    'int8': pa.int8(),
+    'int32': pa.int32(),
+    'int64': pa.int64(),
+    'float32': pa.float32(),
+    'string[pyarrow]': pa.large_string(),
+    'category': pa.dictionary(pa.int8(), pa.large_string()),
+}
+
+# Columns transform() uses besides its null check.
+TRANSFORM_COLUMNS: List[str] = ['PassengerId', 'Pclass', 'Sex', 'Age', 'Fare']
+
+# transform() drops rows with a null in any of these; like the original dropna(), every column.
+DEFAULT_NULL_CHECK: List[str] = list(PASSENGER_DTYPES)
+
+def pruned_columns(null_check: Optional[List[str]] = None) -> List[str]:
+    """
+    Columns to read when pruning: TRANSFORM_COLUMNS plus every column the null check looks at,
+    so pruning never changes which rows survive. Only narrowing the null check itself does.
+    """
+    checked = DEFAULT_NULL_CHECK if null_check is None else null_check
+    return [name for name in PASSENGER_DTYPES if name in TRANSFORM_COLUMNS or name in checked]
+
+def read_csv_options(typed: bool = True, columns: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Keyword arguments for pandas/dask read_csv applying the passenger schema and pruning."""
+    options: Dict[str, Any] = {}
+    if columns:
+        unknown = set(columns) - set(PASSENGER_DTYPES)
+        if unknown:
+            raise ValueError(f"Unknown passenger columns: {sorted(unknown)}")
+        options['usecols'] = columns
+    if typed:
+        options['dtype'] = {name: dtype for name, dtype in PASSENGER_DTYPES.items() if not columns or name in columns}
+    return options
+
+def arrow_schema(dtypes: Dict[str, str]) -> pa.Schema:
+    """Arrow schema for a frame with these pandas dtypes (as in PASSENGER_DTYPES)."""
+    return pa.schema([(name, ARROW_TYPES[dtype]) for name, dtype in dtypes.items()])
@@ -0,0 +1,40 @@
+import argparse, logging, os, tempfile, time
+import dask.dataframe as dd
+import pandas as pd
+from common.passenger_schema import pruned_columns, read_csv_options
+
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'pandas', 'small_dataset.csv')
+
+def synthetic_passengers(path: str, copies: int) -> None:
+    """Repeats the sample Titanic dataset `copies` times."""
+    sample = pd.read_csv(SAMPLE_FILE)
+    with open(path, mode='w', newline='') as file:
+        for copy in range(copies):
+            sample.to_csv(file, index=False, header=copy == 0)
+
+def measure(name: str, read) -> None:
+    start_time = time.time()
+    df = read()
+    elapsed = time.time() - start_time
+    logging.info(f"{name}: {len(df)} rows in {elapsed:.2f} seconds, {df.memory_usage(deep=True).sum() / 2**20:.1f} MiB in memory")
+
+def run_benchmark(copies: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'passengers.csv')
+        synthetic_passengers(path, copies)
+        logging.info(f"Input: {os.path.getsize(path) / 2**20:.1f} MiB")
+        variants = {
+            'inferred': read_csv_options(typed=False),
+            'typed': read_csv_options(typed=True),
+            'typed + pruned, null check on Age': read_csv_options(typed=True, columns=pruned_columns(['Age'])),
+        }
+        for name, options in variants.items():
+            measure(f'pandas {name}', lambda: pd.read_csv(path, **options))
+            measure(f'dask {name}', lambda: dd.read_csv(path, blocksize='100MB', **options).compute())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare inferred, typed and pruned passenger CSV parsing.")
+    parser.add_argument('--copies', type=int, default=2000, help="Times the 891-row sample is repeated")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    run_benchmark(args.copies)
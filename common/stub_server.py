@@ -0,0 +1,33 @@
+import unittest, socket, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+# Builds a stub: the request handler class and the state dict it records into
+HandlerFactory = Callable[..., Tuple[Type[BaseHTTPRequestHandler], Dict[str, Any]]]
+
+def start_stub_server(make_handler: HandlerFactory, receive_buffer: Optional[int] = None,
+                      **options) -> Tuple[ThreadingHTTPServer, str, Dict[str, Any]]:
+    """
+    Serves make_handler(**options) on a free local port from a daemon thread and returns
+    (server, base url, state). `receive_buffer` shrinks SO_RCVBUF so the kernel can't buffer
+    a slow reader's input. Call server.shutdown() and server.server_close() when done.
+    """
+    handler, state = make_handler(**options)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler, bind_and_activate=False)
+    if receive_buffer:
+        server.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer)
+    server.server_bind()
+    server.server_activate()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}', state
+
+class StubServerTestCase(unittest.TestCase):
+    """Test case that serves stub HTTP handlers on free local ports, shut down after each test."""
+
+    def start_stub_server(self, make_handler: HandlerFactory, receive_buffer: Optional[int] = None,
+                          **options) -> Tuple[str, Dict[str, Any]]:
+        """Like the module-level start_stub_server, returning (base url, state)."""
+        server, url, state = start_stub_server(make_handler, receive_buffer, **options)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return url, state
@@ -1,47 +1,213 @@
 import requests, logging, os, json
+import argparse
+import dask
 import dask.dataframe as dd
 import pandas as pd
-from typing import Optional
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+from typing import Any, List, Optional, Tuple
+from dask.delayed import Delayed
 import time
+from common.passenger_schema import pruned_columns, read_csv_options
 
-def extract(file_path: str) -> dd.DataFrame:
+@dataclass(frozen=True)
+class SchedulerConfig:
+    """Where the dask graph runs: 'threads', 'processes' or a 'distributed' LocalCluster."""
+    scheduler: str = 'threads'
+    workers: Optional[int] = None
+    threads_per_worker: int = 1
+    memory_limit: str = 'auto'
+    blocksize: str = '100MB'
+    report_path: Optional[str] = None
+
+@contextmanager
+def scheduler_context(config: SchedulerConfig):
+    """Activates the configured scheduler and, if report_path is set, records an HTML report."""
+    with ExitStack() as stack:
+        if config.scheduler == 'distributed':
+            from distributed import Client, LocalCluster, performance_report
+            cluster = stack.enter_context(LocalCluster(
+                n_workers=config.workers,
+                threads_per_worker=config.threads_per_worker,
+                memory_limit=config.memory_limit
+            ))
+            client = stack.enter_context(Client(cluster))
+            logging.info(f"Dask dashboard: {client.dashboard_link}")
+            if config.report_path:
+                stack.enter_context(performance_report(filename=config.report_path))
+        elif config.scheduler in ('threads', 'processes'):
+            stack.enter_context(dask.config.set(scheduler=config.scheduler, num_workers=config.workers))
+            if config.report_path:
+                from dask.diagnostics import Profiler, ResourceProfiler, visualize
+                profilers = [stack.enter_context(Profiler()), stack.enter_context(ResourceProfiler())]
+                stack.callback(lambda: visualize(profilers, filename=config.report_path, show=False, save=True))
+        else:
+            raise ValueError(f"Unknown scheduler: {config.scheduler}")
+        yield
+
+def extract(file_path: str, typed: bool = True, columns: Optional[List[str]] = None, blocksize: str = '100MB') -> dd.DataFrame:
     start_time = time.time()
-    df = dd.read_csv(file_path, blocksize='100MB')
+    df = dd.read_csv(file_path, blocksize=blocksize, **read_csv_options(typed, columns))
     end_time = time.time()
     logging.info(f"Extraction completed in {end_time - start_time:.2f} seconds")
     return df
 
-def transform(df: dd.DataFrame) -> dd.DataFrame:
+def transform(df: dd.DataFrame, null_check: Optional[List[str]] = None) -> dd.DataFrame:
+    """Drops rows with nulls in `null_check` (every column when None) and passengers aged 18 or under."""
     start_time = time.time()
-    df_cleaned = df.dropna()
+    df_cleaned = df.dropna(subset=null_check)
     df_cleaned['Age'] = df_cleaned['Age'].astype(int)
     df_filtered = df_cleaned[df_cleaned['Age'] > 18]
     end_time = time.time()
     logging.info(f"Transformation completed in {end_time - start_time:.2f} seconds")
     return df_filtered
 
-def load(df: dd.DataFrame, output_file_path: str) -> None:
+def load(df: dd.DataFrame, output_file_path: str, compute: bool = True):
+    """Writes the CSV; with compute=False returns the delayed writes so they can share a compute."""
     start_time = time.time()
-    df.to_csv(output_file_path, index=False, single_file=True)
-    end_time = time.time()
-    logging.info(f"Loading completed in {end_time - start_time:.2f} seconds")
+    result = df.to_csv(output_file_path, index=False, single_file=True, compute=compute)
+    if compute:
+        end_time = time.time()
+        logging.info(f"Loading completed in {end_time - start_time:.2f} seconds")
+    return result
+
+@dataclass(frozen=True)
+class ParquetOutput:
+    """Parquet layout: hive directories per partition_on value, compression and row-group size."""
+    partition_on: Optional[List[str]] = None
+    compression: Optional[str] = 'zstd'
+    row_group_size: Optional[int] = 100_000
+
+def load_parquet(df: dd.DataFrame, output_path: str, output: ParquetOutput = ParquetOutput(), compute: bool = True):
+    """Writes every partition in parallel to a Parquet dataset directory."""
+    start_time = time.time()
+    options = {'row_group_size': output.row_group_size} if output.row_group_size else {}
+    result = df.to_parquet(
+        output_path,
+        engine='pyarrow',
+        partition_on=output.partition_on,
+        compression=output.compression,
+        write_index=False,
+        overwrite=True,
+        compute=compute,
+        **options
+    )
+    if compute:
+        end_time = time.time()
+        logging.info(f"Loading completed in {end_time - start_time:.2f} seconds")
+    return result
 
-def etl_pipeline(input_file_path: str, output_file_path: str):
+def read_parquet(path: str, filters: Optional[List[Tuple[str, str, Any]]] = None,
+                 columns: Optional[List[str]] = None) -> dd.DataFrame:
+    """
+    Reads a dataset written by load_parquet. Filters such as [('Age', '>', 18)] are pushed down:
+    hive directories and row groups whose statistics cannot match are skipped, and remaining
+    rows are filtered while reading.
+    """
+    return dd.read_parquet(path, engine='pyarrow', filters=filters, columns=columns)
+
+def count_rows(df: dd.DataFrame):
+    """Lazy row count built from partition lengths, computed alongside other outputs."""
+    return df.map_partitions(len).sum()
+
+def write_csv_partition(part: pd.DataFrame, output_file_path: str, first: bool, previous: int = 0) -> int:
+    """Appends one partition to the CSV (creating it for the first) and returns the rows written so far."""
+    part.to_csv(output_file_path, index=False, header=first, mode='w' if first else 'a')
+    return previous + len(part)
+
+def load_partitions(partitions: List[Delayed], output_file_path: str) -> Delayed:
+    """
+    Lazy single-file CSV write of delayed partitions, chained so they are appended in order.
+    Computes to the number of rows written.
+    """
+    written = None
+    for index, part in enumerate(partitions):
+        written = dask.delayed(write_csv_partition)(part, output_file_path, index == 0, 0 if written is None else written)
+    return written
+
+def etl_pipeline(input_file_path: str, output_file_path: str, typed: bool = True, columns: Optional[List[str]] = None,
+                 persist: bool = False, scheduler: SchedulerConfig = SchedulerConfig(),
+                 parquet: Optional[ParquetOutput] = None, null_check: Optional[List[str]] = None):
+    with scheduler_context(scheduler):
+        run_pipeline(input_file_path, output_file_path, typed, columns, persist, scheduler.blocksize, parquet,
+                     null_check)
+
+def run_pipeline(input_file_path: str, output_file_path: str, typed: bool, columns: Optional[List[str]],
+                 persist: bool, blocksize: str, parquet: Optional[ParquetOutput] = None,
+                 null_check: Optional[List[str]] = None):
+    """
+    Builds one lazy graph and executes it once, reading each input block a single time. The CSV
+    path works on the unfused input and output partitions, so the write and both row counts
+    share the read tasks instead of each building their own. With persist=True the transformed frame is materialised
+    in memory first (the input row count is taken in the same pass). When `parquet` is given
+    the output is a Parquet dataset directory instead of a single CSV file.
+    """
     start_time = time.time()
     
-    df: dd.DataFrame = extract(input_file_path)
-    logging.info(f"DataFrame loaded with {len(df)} partitions")
+    df: dd.DataFrame = extract(input_file_path, typed, columns, blocksize)
+    logging.info(f"DataFrame loaded with {df.npartitions} partitions")
     
-    df_transformed = transform(df)
-    logging.info(f"Transformed DataFrame with {len(df_transformed)} partitions")
+    df_transformed = transform(df, null_check)
+    logging.info(f"Transformed DataFrame with {df_transformed.npartitions} partitions")
+    input_rows = count_rows(df)
+
+    if persist:
+        persist_start = time.time()
+        df_transformed, input_rows = dask.persist(df_transformed, input_rows)
+        logging.info(f"Persisted transformed DataFrame in {time.time() - persist_start:.2f} seconds")
     
-    load(df_transformed, output_file_path)
+    load_start = time.time()
+    if parquet is not None:
+        writes = load_parquet(df_transformed, output_file_path, parquet, compute=False)
+        _, input_count, output_count = dask.compute(writes, input_rows, count_rows(df_transformed))
+    else:
+        # optimize_graph=False keeps the read tasks unfused, so input and output partitions share them
+        written = load_partitions(df_transformed.to_delayed(optimize_graph=False), output_file_path)
+        if persist:
+            input_count, output_count = input_rows.compute(), written.compute()
+        else:
+            input_total = sum(dask.delayed(len)(part) for part in df.to_delayed(optimize_graph=False))
+            input_count, output_count = dask.compute(input_total, written)
+    logging.info(f"Loading completed in {time.time() - load_start:.2f} seconds")
+    logging.info(f"Read {input_count} rows, wrote {output_count} rows")
     
     end_time = time.time()
     logging.info(f"ETL pipeline completed in {end_time - start_time:.2f} seconds")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clean the passenger CSV with dask.")
+    parser.add_argument('--input', default='small_dataset.csv', help="Input CSV file")
+    parser.add_argument('--output', help="Output CSV file or Parquet directory")
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv', help="Output format")
+    parser.add_argument('--partition-on', nargs='+', help="Hive-partition Parquet output by these columns, e.g. Pclass")
+    parser.add_argument('--compression', choices=['zstd', 'snappy', 'gzip', 'none'], default='zstd', help="Parquet compression")
+    parser.add_argument('--row-group-size', type=int, default=100_000, help="Rows per Parquet row group")
+    parser.add_argument('--untyped', action='store_true', help="Let read_csv infer dtypes instead of the passenger schema")
+    parser.add_argument('--persist', action='store_true', help="Persist the transformed DataFrame before writing")
+    parser.add_argument('--scheduler', choices=['threads', 'processes', 'distributed'], default='threads', help="Dask scheduler")
+    parser.add_argument('--workers', type=int, help="Workers (processes for distributed, threads/processes otherwise)")
+    parser.add_argument('--threads-per-worker', type=int, default=1, help="Threads per distributed worker")
+    parser.add_argument('--memory-limit', default='auto', help="Memory limit per distributed worker, e.g. 4GB")
+    parser.add_argument('--blocksize', default='100MB', help="Bytes per CSV partition")
+    parser.add_argument('--report', help="Write a dask performance/profile report to this HTML file")
+    parser.add_argument('--prune', action='store_true', help="Only read the columns the transform and the null check use")
+    parser.add_argument('--null-check', nargs='+', help="Only drop rows with nulls in these columns (default: all; changes the output)")
+    args = parser.parse_args()
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-    input_file = 'small_dataset.csv'
-    output_file = 'cleaned_dataset.csv'
-    etl_pipeline(input_file, output_file)
+    parquet = None
+    if args.format == 'parquet':
+        parquet = ParquetOutput(
+            partition_on=args.partition_on,
+            compression=None if args.compression == 'none' else args.compression,
+            row_group_size=args.row_group_size
+        )
+    output = args.output or ('cleaned_dataset' if parquet else 'cleaned_dataset.csv')
+    etl_pipeline(args.input, output, typed=not args.untyped, columns=pruned_columns(args.null_check) if args.prune else None,
+                 null_check=args.null_check, persist=args.persist, scheduler=SchedulerConfig(
+                     scheduler=args.scheduler,
+                     workers=args.workers,
+                     threads_per_worker=args.threads_per_worker,
+                     memory_limit=args.memory_limit,
+                     blocksize=args.blocksize,
+                     report_path=args.report
+                 ), parquet=parquet)
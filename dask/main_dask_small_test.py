@@ -0,0 +1,51 @@
+import unittest, logging, os, tempfile, warnings
+from unittest.mock import patch
+import dask.dataframe.io.csv as dask_csv
+import pandas as pd
+from main_dask_small import ParquetOutput, SchedulerConfig, etl_pipeline, extract
+
+INPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'small_dataset.csv')
+
+class TestPipelineScans(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.scheduler = SchedulerConfig(scheduler='threads', blocksize='20KB')
+        self.blocks = extract(INPUT, blocksize=self.scheduler.blocksize).npartitions
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def run_counting_reads(self, output: str, **options) -> int:
+        """Runs the pipeline and returns how many times a CSV block was parsed."""
+        reads = []
+        read_text = dask_csv.pandas_read_text
+
+        def counting_read_text(*args, **kwargs):
+            reads.append(1)
+            return read_text(*args, **kwargs)
+
+        with patch.object(dask_csv, 'pandas_read_text', counting_read_text), warnings.catch_warnings():
+            warnings.simplefilter('error')
+            etl_pipeline(INPUT, output, scheduler=self.scheduler, **options)
+        return len(reads)
+
+    def test_splits_input_into_several_blocks(self):
+        self.assertGreater(self.blocks, 1)
+
+    def test_csv_output_reads_each_block_once(self):
+        output = os.path.join(self.tmp_dir.name, 'cleaned.csv')
+        self.assertEqual(self.run_counting_reads(output), self.blocks)
+        expected = pd.read_csv(INPUT).dropna()
+        self.assertEqual(len(pd.read_csv(output)), (expected['Age'].astype(int) > 18).sum())
+
+    def test_persisted_csv_output_reads_each_block_once(self):
+        self.assertEqual(self.run_counting_reads(os.path.join(self.tmp_dir.name, 'cleaned.csv'), persist=True), self.blocks)
+
+    def test_parquet_output_reads_each_block_once(self):
+        output = os.path.join(self.tmp_dir.name, 'cleaned')
+        self.assertEqual(self.run_counting_reads(output, parquet=ParquetOutput()), self.blocks)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    unittest.main()
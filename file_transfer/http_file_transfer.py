@@ -1,10 +1,19 @@
+import asyncio
+import mimetypes
+import os
+import threading
+import time
+import uuid
+import aiohttp
 import requests
-from dataclasses import dataclass
-from typing import Final, Callable, Optional
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import IO, Any, AsyncIterator, Awaitable, Callable, Iterable, Iterator, List, Optional, Tuple
+from requests.adapters import HTTPAdapter
 from requests.exceptions import HTTPError, RequestException
 
-from dataclasses import dataclass
-from typing import Callable, Optional
+MB = 1024 * 1024
+RETRY_STATUSES = {429, 500, 502, 503, 504}
 
 @dataclass(frozen=True)
 class ApiConfig:
@@ -15,60 +24,357 @@ class ApiConfig:
     client_id: str
     client_secret: str
     token_interceptor: Optional[Callable[[], str]] = None
+    # Lifetime of tokens without an 'expires_in' (custom interceptors), and how early to renew them
+    token_ttl: int = 300
+    token_refresh_margin: int = 30
+    pool_maxsize: int = 10
+    chunk_size: int = MB
+    field_name: str = 'file'
+
+@dataclass(frozen=True)
+class BatchUploadConfig:
+    """Settings for ApiClient.upload_files(). A rate of 0 disables the rate limit."""
+    concurrency: int = 8
+    rate: float = 0.0
+    burst: int = 1
+    retries: int = 3
+    backoff: float = 0.5
+    max_backoff: float = 60.0
+
+@dataclass
+class UploadResult:
+    local_file: str
+    status: Optional[int] = None
+    bytes_sent: int = 0
+    seconds: float = 0.0
+    attempts: int = 0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+@dataclass
+class BatchUploadReport:
+    results: List[UploadResult] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def failed(self) -> List[UploadResult]:
+        return [result for result in self.results if not result.ok]
+
+    @property
+    def bytes_transferred(self) -> int:
+        return sum(result.bytes_sent for result in self.results if result.ok)
+
+    @property
+    def throughput_mb_s(self) -> float:
+        return self.bytes_transferred / MB / self.seconds if self.seconds else 0.0
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average with bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Parses a Retry-After header given either as seconds or as an HTTP date."""
+    if value is None:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+async def with_idle_timeout(awaitable: Awaitable[Any], last_activity: Callable[[], float], timeout: float) -> Any:
+    """
+    Awaits `awaitable`, cancelling it once `timeout` seconds pass since `last_activity()` (a loop
+    time). Unlike a total deadline this never cuts off a slow upload that is still progressing.
+    """
+    loop = asyncio.get_running_loop()
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            idle = loop.time() - last_activity()
+            if idle >= timeout:
+                raise asyncio.TimeoutError(f"No progress for {timeout}s")
+            done, _ = await asyncio.wait({task}, timeout=timeout - idle)
+            if done:
+                return task.result()
+    finally:
+        if not task.done():
+            task.cancel()
+
+class TokenCache:
+    """
+    Keeps a bearer token until shortly before it expires. `fetch` returns the token and its
+    lifetime in seconds (None to use default_ttl). Safe to share between threads.
+    """
+
+    def __init__(self, fetch: Callable[[], Tuple[str, Optional[int]]], default_ttl: int = 300, refresh_margin: int = 30):
+        self.fetch = fetch
+        self.default_ttl = default_ttl
+        self.refresh_margin = refresh_margin
+        self.token: Optional[str] = None
+        self.expires_at = 0.0
+        self.lock = threading.Lock()
+
+    def get(self) -> str:
+        with self.lock:
+            if self.token is None or time.monotonic() >= self.expires_at - self.refresh_margin:
+                token, expires_in = self.fetch()
+                self.token = token
+                self.expires_at = time.monotonic() + (self.default_ttl if expires_in is None else expires_in)
+            return self.token
+
+    def invalidate(self) -> None:
+        with self.lock:
+            self.token = None
+
+class MultipartFileStream:
+    """
+    A multipart/form-data body holding one file field, produced chunk by chunk while it is
+    sent. Its length is known up front, so requests sends a Content-Length header and streams
+    the iterator instead of building the body in memory. It can be iterated again to retry.
+    """
+
+    def __init__(self, local_file: str, field_name: str = 'file', chunk_size: int = MB):
+        self.local_file = local_file
+        self.chunk_size = chunk_size
+        self.boundary = uuid.uuid4().hex
+        filename = os.path.basename(local_file)
+        content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        self.head = (
+            f'--{self.boundary}\r\n'
+            f'Content-Disposition: form-data; name="{field_name}"; filename="{filename}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'
+        ).encode()
+        self.tail = f'\r\n--{self.boundary}--\r\n'.encode()
+        self.file_size = os.path.getsize(local_file)
+
+    @property
+    def content_type(self) -> str:
+        return f'multipart/form-data; boundary={self.boundary}'
+
+    def __len__(self) -> int:
+        return len(self.head) + self.file_size + len(self.tail)
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield self.head
+        with open(self.local_file, 'rb') as file:
+            for chunk in iter(lambda: file.read(self.chunk_size), b''):
+                yield chunk
+        yield self.tail
+
+    async def iter_async(self, file: IO[bytes], progress: Callable[[], None]) -> AsyncIterator[bytes]:
+        """
+        The same body for aiohttp, read from an already open `file` in the default executor.
+        `progress` is called whenever a chunk has been handed to the connection.
+        """
+        loop = asyncio.get_running_loop()
+        yield self.head
+        while chunk := await loop.run_in_executor(None, file.read, self.chunk_size):
+            yield chunk
+            progress()
+        yield self.tail
 
 class ApiClient:
     """Client class for interacting with the API."""
 
     def __init__(self, config: ApiConfig):
         self.config = config
-        self.token_interceptor = config.TOKEN_INTERCEPTOR or self._default_token_interceptor
+        # One pooled session for token and upload requests, so connections are reused
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=config.pool_maxsize)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.tokens = TokenCache(self._fetch_token, config.token_ttl, config.token_refresh_margin)
+
+    def _fetch_token(self) -> Tuple[str, Optional[int]]:
+        """Token source behind the cache: config.token_interceptor if set, else client credentials."""
+        if self.config.token_interceptor:
+            return self.config.token_interceptor(), None
+        return self._request_token()
 
-    def _default_token_interceptor(self) -> str:
-        """Default method for obtaining an OAuth2 token."""
+    def _request_token(self) -> Tuple[str, Optional[int]]:
         payload = {
             'grant_type': 'client_credentials',
-            'client_id': self.config.CLIENT_ID,
-            'client_secret': self.config.CLIENT_SECRET
+            'client_id': self.config.client_id,
+            'client_secret': self.config.client_secret
         }
         try:
-            response = requests.post(self.config.TOKEN_URL, data=payload)
-            response.raise_for_status()  
+            response = self.session.post(self.config.token_url, data=payload, timeout=self.config.timeout)
+            response.raise_for_status()
             token_data = response.json()
-            return token_data.get('access_token')
+            expires_in = token_data.get('expires_in')
+            return token_data['access_token'], int(expires_in) if expires_in is not None else None
         except requests.RequestException as e:
             raise RuntimeError(f"Failed to retrieve OAuth2 token: {e}")
         except KeyError:
             raise RuntimeError("Token response is missing 'access_token' field")
 
-    def upload_file_to_api(self, local_file: str) -> None:
-        """Uploads a file to the configured API endpoint."""
+    def _post_file(self, local_file: str) -> requests.Response:
+        body = MultipartFileStream(local_file, self.config.field_name, self.config.chunk_size)
+        response = None
+        for _ in range(2):
+            response = self.session.post(
+                self.config.api_url,
+                data=body,
+                headers={'Authorization': f'Bearer {self.tokens.get()}', 'Content-Type': body.content_type},
+                timeout=self.config.timeout
+            )
+            if response.status_code != 401:
+                break
+            # Revoked or expired early: fetch a new token and send the file once more
+            self.tokens.invalidate()
+        return response
+
+    def upload_file_to_api(self, local_file: str) -> requests.Response:
+        """Streams a file to the configured API endpoint as multipart/form-data."""
         try:
-            auth_token = self.token_interceptor()
-            with open(local_file, 'rb') as file:
-                response = requests.post(
-                    self.config.API_URL,
-                    files={'file': file},
-                    headers={'Authorization': f'Bearer {auth_token}'},
-                    timeout=self.config.TIMEOUT
-                )
+            response = self._post_file(local_file)
             response.raise_for_status()  # Raise HTTPError for bad responses
             print("Upload Successful:", response.status_code, response.text)
+            return response
         except FileNotFoundError:
             raise FileNotFoundError(f"File '{local_file}' not found")
         except requests.RequestException as e:
             raise RuntimeError(f"Failed to upload file to API: {e}")
+        except RuntimeError:
+            raise
         except Exception as e:
             raise RuntimeError(f"An unexpected error occurred: {e}")
 
+    async def _upload_one(self, session: aiohttp.ClientSession, local_file: str, config: BatchUploadConfig,
+                          semaphore: asyncio.Semaphore, bucket: TokenBucket) -> UploadResult:
+        """Uploads one file, retrying transient failures with backoff that honours Retry-After."""
+        result = UploadResult(local_file)
+        start_time = time.time()
+        loop = asyncio.get_running_loop()
+        try:
+            size = os.path.getsize(local_file)
+        except OSError as e:
+            result.error = f"File '{local_file}' not found: {e}"
+            return result
+        for attempt in range(config.retries + 1):
+            delay = min(config.backoff * 2 ** attempt, config.max_backoff)
+            result.attempts = attempt + 1
+            try:
+                async with semaphore:
+                    await bucket.acquire()
+                    # Usually cached; a refresh goes through the blocking token request
+                    token = await loop.run_in_executor(None, self.tokens.get)
+                    try:
+                        body = MultipartFileStream(local_file, self.config.field_name, self.config.chunk_size)
+                        file = open(local_file, 'rb')
+                    except OSError as e:
+                        # The file vanished or became unreadable after it was sized
+                        result.error = f"File '{local_file}' could not be read: {e}"
+                        break
+                    # A read failing mid-upload surfaces as aiohttp.ClientOSError and is retried
+                    with file:
+                        last_activity = [loop.time()]
+                        request = session.post(
+                            self.config.api_url,
+                            data=body.iter_async(file, lambda: last_activity.__setitem__(0, loop.time())),
+                            headers={'Authorization': f'Bearer {token}', 'Content-Type': body.content_type,
+                                     'Content-Length': str(len(body))}
+                        )
+                        response = await with_idle_timeout(request, lambda: last_activity[0], self.config.timeout)
+                        async with response:
+                            await asyncio.wait_for(response.read(), self.config.timeout)
+                            result.status = response.status
+                if result.status < 400:
+                    result.bytes_sent = size
+                    result.error = None
+                    break
+                result.error = f"HTTP {result.status}"
+                if result.status == 401:
+                    self.tokens.invalidate()
+                    delay = 0.0
+                elif result.status not in RETRY_STATUSES:
+                    break
+                else:
+                    retry_after = retry_after_seconds(response.headers.get('Retry-After'))
+                    if retry_after is not None:
+                        delay = min(max(delay, retry_after), config.max_backoff)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                result.error = repr(e)
+            except (RuntimeError, requests.RequestException) as e:
+                # Token request failed, possibly inside a custom token_interceptor
+                result.error = str(e)
+                break
+            if attempt < config.retries:
+                print(f"Upload of {local_file} failed ({result.error}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+        result.seconds = time.time() - start_time
+        return result
+
+    async def upload_files_async(self, local_files: Iterable[str],
+                                 config: BatchUploadConfig = BatchUploadConfig()) -> BatchUploadReport:
+        """
+        Uploads many files with at most `concurrency` in flight over one pooled aiohttp
+        session, starting no more than `rate` uploads per second.
+        """
+        semaphore = asyncio.Semaphore(config.concurrency)
+        bucket = TokenBucket(config.rate, config.burst)
+        connector = aiohttp.TCPConnector(limit=config.concurrency, keepalive_timeout=30)
+        # Like the requests timeout, config.timeout bounds connecting and each stall, not the whole
+        # upload. aiohttp's sock_read would start counting when the body starts, so stalls are
+        # caught by with_idle_timeout() instead.
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=self.config.timeout)
+        start_time = time.time()
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            results = await asyncio.gather(*(self._upload_one(session, local_file, config, semaphore, bucket)
+                                             for local_file in local_files))
+        report = BatchUploadReport(list(results), time.time() - start_time)
+        print(f"Uploaded {len(report.results) - len(report.failed)} files ({report.bytes_transferred / MB:.1f} MB) in "
+              f"{report.seconds:.2f}s ({report.throughput_mb_s:.1f} MB/s), failed {len(report.failed)}")
+        for result in report.failed:
+            print(f"An error occurred uploading {result.local_file}: {result.error}")
+        return report
+
+    def upload_files(self, local_files: Iterable[str], config: BatchUploadConfig = BatchUploadConfig()) -> BatchUploadReport:
+        """Synchronous entry point for upload_files_async()."""
+        return asyncio.run(self.upload_files_async(local_files, config))
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> 'ApiClient':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
 def get_google_token(api_config: ApiConfig) -> str:
     """Custom token retrieval logic for Google OAuth2 using configuration."""
     payload = {
         'grant_type': 'client_credentials',
-        'client_id': api_config.CLIENT_ID,
-        'client_secret': api_config.CLIENT_SECRET
+        'client_id': api_config.client_id,
+        'client_secret': api_config.client_secret
     }
     try:
-        response = requests.post(api_config.TOKEN_URL, data=payload)
+        response = requests.post(api_config.token_url, data=payload, timeout=api_config.timeout)
         response.raise_for_status()  # Raise HTTPError for bad responses
         token_data = response.json()
         # Ensure 'access_token' is in the response data
@@ -97,9 +403,9 @@ if __name__ == "__main__":
         token_url='https://oauth2.googleapis.com/token',
         timeout=30,
         client_id='YOUR_CLIENT_ID',
-        client_secret='YOUR_CLIENT_SECRET', 
-        token_interceptor= lambda: no_interceptor()  
-     #   TOKEN_INTERCEPTOR= lambda: get_google_token(api_config)  
+        client_secret='YOUR_CLIENT_SECRET',
+        token_interceptor= lambda: no_interceptor()
+     #   token_interceptor= lambda: get_google_token(api_config)
     )
-    api_client = ApiClient(api_config)
-    api_client.upload_file_to_api('./data.parquet')
\ No newline at end of file
+    with ApiClient(api_config) as api_client:
+        api_client.upload_file_to_api('./data.parquet')
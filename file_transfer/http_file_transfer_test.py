@@ -0,0 +1,248 @@
+import unittest, json, logging, os, re, tempfile, threading, time
+import requests
+from http.server import BaseHTTPRequestHandler
+from common.stub_server import StubServerTestCase
+from http_file_transfer import ApiClient, ApiConfig, BatchUploadConfig, MultipartFileStream, retry_after_seconds
+
+def upload_handler(expires_in=3600, latency: float = 0.0, revoke_first: bool = False, throttled: int = 0,
+                      retry_after: str = '0', read_delay: float = 0.0):
+    """
+    Serves /token (client credentials) and /upload (multipart, bearer auth).
+    Uploads take `latency` seconds; the first `throttled` ones get 429 with Retry-After.
+    `read_delay` is slept before reading each 64 KiB of a request body (a slow link).
+    """
+    state = {'tokens': 0, 'uploads': [], 'chunked': 0, 'revoke_first': revoke_first, 'throttled': throttled,
+             'in_flight': 0, 'max_in_flight': 0, 'lock': threading.Lock()}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def reply(self, status: int, payload=None, headers=None):
+            body = json.dumps(payload).encode() if payload is not None else b''
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def read(self, size: int) -> bytes:
+            chunks = []
+            while size > 0:
+                if read_delay:
+                    time.sleep(read_delay)
+                chunks.append(self.rfile.read(min(size, 64 * 1024)))
+                size -= len(chunks[-1])
+            return b''.join(chunks)
+
+        def read_body(self) -> bytes:
+            if self.headers.get('Transfer-Encoding') != 'chunked':
+                return self.read(int(self.headers['Content-Length']))
+            state['chunked'] += 1
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b';')[0], 16)
+                chunks.append(self.read(size))
+                self.rfile.readline()
+                if size == 0:
+                    return b''.join(chunks)
+
+        def do_POST(self):
+            body = self.read_body()
+            if self.path == '/token':
+                with state['lock']:
+                    state['tokens'] += 1
+                    token = f"token-{state['tokens']}"
+                self.reply(200, {'access_token': token, 'expires_in': expires_in})
+                return
+            if self.headers['Authorization'] != f"Bearer token-{state['tokens']}" or state['revoke_first']:
+                state['revoke_first'] = False
+                self.reply(401, {'error': 'invalid_token'})
+                return
+            with state['lock']:
+                throttle = state['throttled'] > 0
+                state['throttled'] -= 1
+                state['in_flight'] += 1
+                state['max_in_flight'] = max(state['max_in_flight'], state['in_flight'])
+            if latency:
+                time.sleep(latency)
+            with state['lock']:
+                state['in_flight'] -= 1
+            if throttle:
+                self.reply(429, {'error': 'slow down'}, {'Retry-After': retry_after})
+                return
+            # Single-part multipart/form-data: headers, blank line, content, closing boundary
+            boundary = self.headers['Content-Type'].split('boundary=')[1].encode()
+            head, content = body.split(b'\r\n\r\n', 1)
+            content = content[:content.rindex(b'\r\n--' + boundary + b'--')]
+            filename = re.search(rb'filename="([^"]*)"', head).group(1).decode()
+            with state['lock']:
+                state['uploads'].append((filename, content))
+            self.reply(201, {'size': len(content)})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler, state
+
+class TestApiClient(StubServerTestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.local_file = os.path.join(self.tmp_dir.name, 'data.parquet')
+        self.content = os.urandom(3 * 1024 * 1024 + 7)
+        with open(self.local_file, 'wb') as file:
+            file.write(self.content)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def client(self, url: str, **overrides) -> ApiClient:
+        config = ApiConfig(api_url=f'{url}/upload', token_url=f'{url}/token', timeout=10,
+                           client_id='client', client_secret='secret', **overrides)
+        return ApiClient(config)
+
+    def test_streams_multipart_upload_and_reuses_token(self):
+        url, state = self.start_stub_server(upload_handler)
+        with self.client(url, chunk_size=256 * 1024) as client:
+            for _ in range(3):
+                client.upload_file_to_api(self.local_file)
+        self.assertEqual(state['tokens'], 1)
+        self.assertEqual(state['chunked'], 0)
+        self.assertEqual(state['uploads'], [('data.parquet', self.content)] * 3)
+
+    def test_refreshes_expired_token(self):
+        url, state = self.start_stub_server(upload_handler, expires_in=10)
+        with self.client(url, token_refresh_margin=10) as client:
+            client.upload_file_to_api(self.local_file)
+            client.upload_file_to_api(self.local_file)
+        self.assertEqual(state['tokens'], 2)
+
+    def test_retries_once_with_new_token_after_401(self):
+        url, state = self.start_stub_server(upload_handler, revoke_first=True)
+        with self.client(url) as client:
+            client.upload_file_to_api(self.local_file)
+        self.assertEqual(state['tokens'], 2)
+        self.assertEqual(len(state['uploads']), 1)
+
+    def test_token_interceptor_goes_through_cache(self):
+        url, state = self.start_stub_server(upload_handler)
+        calls = []
+        with self.client(url, token_interceptor=lambda: calls.append(1) or 'token-0') as client:
+            client.upload_file_to_api(self.local_file)
+            client.upload_file_to_api(self.local_file)
+        self.assertEqual((len(calls), state['tokens'], len(state['uploads'])), (1, 0, 2))
+
+    def test_multipart_stream_length_and_chunks(self):
+        body = MultipartFileStream(self.local_file, chunk_size=64 * 1024)
+        chunks = list(body)
+        self.assertEqual(sum(len(chunk) for chunk in chunks), len(body))
+        self.assertLessEqual(max(len(chunk) for chunk in chunks[1:-1]), 64 * 1024)
+        self.assertEqual(b''.join(chunks), b''.join(body))
+
+class TestBatchUpload(StubServerTestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.files = []
+        for i in range(6):
+            local_file = os.path.join(self.tmp_dir.name, f'part-{i}.parquet')
+            with open(local_file, 'wb') as file:
+                file.write(os.urandom(256 * 1024 * (i + 1)))
+            self.files.append(local_file)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def client(self, url: str) -> ApiClient:
+        return ApiClient(ApiConfig(api_url=f'{url}/upload', token_url=f'{url}/token', timeout=10,
+                                   client_id='client', client_secret='secret'))
+
+    def test_uploads_concurrently(self):
+        url, state = self.start_stub_server(upload_handler, latency=0.3)
+        with self.client(url) as client:
+            report = client.upload_files(self.files, BatchUploadConfig(concurrency=3))
+        self.assertEqual(report.failed, [])
+        self.assertEqual(state['max_in_flight'], 3)
+        self.assertLess(report.seconds, 6 * 0.3)
+        self.assertEqual(state['tokens'], 1)
+        self.assertEqual(report.bytes_transferred, sum(os.path.getsize(path) for path in self.files))
+        expected = []
+        for path in self.files:
+            with open(path, 'rb') as file:
+                expected.append(file.read())
+        self.assertEqual(sorted(content for _, content in state['uploads']), sorted(expected))
+        self.assertGreater(report.throughput_mb_s, 0)
+
+    def test_rate_limit(self):
+        url, _ = self.start_stub_server(upload_handler)
+        with self.client(url) as client:
+            report = client.upload_files(self.files, BatchUploadConfig(concurrency=6, rate=10, burst=1))
+        self.assertEqual(report.failed, [])
+        # One token up front, then one every 0.1s
+        self.assertGreaterEqual(report.seconds, 0.45)
+
+    def test_honours_retry_after(self):
+        url, _ = self.start_stub_server(upload_handler, throttled=1, retry_after='1')
+        with self.client(url) as client:
+            report = client.upload_files(self.files[:1], BatchUploadConfig(backoff=0.01))
+        self.assertEqual(report.failed, [])
+        self.assertEqual(report.results[0].attempts, 2)
+        self.assertGreaterEqual(report.results[0].seconds, 1.0)
+
+    def test_reports_per_file_failures(self):
+        url, _ = self.start_stub_server(upload_handler, throttled=100)
+        missing = os.path.join(self.tmp_dir.name, 'missing.parquet')
+        with self.client(url) as client:
+            report = client.upload_files([missing, self.files[0]], BatchUploadConfig(retries=1, backoff=0.01))
+        self.assertEqual([result.local_file for result in report.failed], [missing, self.files[0]])
+        self.assertIsNone(report.results[0].status)
+        self.assertEqual((report.results[1].status, report.results[1].attempts), (429, 2))
+
+    def test_unreadable_file_fails_alone(self):
+        url, state = self.start_stub_server(upload_handler)
+        # Has a size but can't be opened, like a file removed between sizing and upload
+        unreadable = os.path.join(self.tmp_dir.name, 'directory.parquet')
+        os.makedirs(unreadable)
+        with self.client(url) as client:
+            report = client.upload_files([unreadable, self.files[0]])
+        self.assertEqual([result.local_file for result in report.failed], [unreadable])
+        self.assertTrue(report.results[1].ok)
+        self.assertEqual(len(state['uploads']), 1)
+
+    def test_token_interceptor_errors_are_not_file_errors(self):
+        url, state = self.start_stub_server(upload_handler)
+
+        def unreachable_token_service() -> str:
+            raise requests.ConnectionError("token service unreachable")
+
+        client = ApiClient(ApiConfig(api_url=f'{url}/upload', token_url=f'{url}/token', timeout=10, client_id='client',
+                                     client_secret='secret', token_interceptor=unreachable_token_service))
+        with client:
+            report = client.upload_files(self.files[:1])
+        self.assertEqual(report.results[0].error, "token service unreachable")
+        self.assertEqual(state['uploads'], [])
+
+    def test_upload_may_outlast_timeout(self):
+        # 32 MiB read at 64 KiB per 5ms takes several seconds, longer than the 1s timeout
+        large_file = os.path.join(self.tmp_dir.name, 'large.parquet')
+        with open(large_file, 'wb') as file:
+            file.write(os.urandom(32 * 1024 * 1024))
+        # A small receive window, so the kernel doesn't buffer the body ahead of the slow reads
+        url, _ = self.start_stub_server(upload_handler, receive_buffer=64 * 1024, read_delay=0.005)
+        client = ApiClient(ApiConfig(api_url=f'{url}/upload', token_url=f'{url}/token', timeout=1,
+                                     client_id='client', client_secret='secret', chunk_size=64 * 1024))
+        with client:
+            report = client.upload_files([large_file], BatchUploadConfig(retries=0))
+        self.assertEqual(report.failed, [])
+        self.assertGreater(report.results[0].seconds, 1.0)
+
+    def test_retry_after_formats(self):
+        self.assertEqual(retry_after_seconds('3'), 3.0)
+        self.assertEqual(retry_after_seconds('Wed, 21 Oct 2015 07:28:00 GMT'), 0.0)
+        self.assertIsNone(retry_after_seconds('soon'))
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    unittest.main()
@@ -1,10 +1,64 @@
 import paramiko
 import ftplib
+import hashlib
 import os
 import logging
-from typing import Optional
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Optional, Tuple
 from dataclasses import dataclass
 from abc import ABC, abstractmethod
+from transfer_report import TransferReport
+
+MB = 1024 * 1024
+DEFAULT_CHUNK_SIZE = 4 * MB
+CHUNK_READ_SIZE = MB
+FTP_BLOCK_SIZE = 256 * 1024
+
+# Called with (bytes transferred so far, total bytes) after every block
+ProgressCallback = Callable[[int, int], None]
+
+class ThroughputLogger:
+    """Progress callback that logs progress and MB/s at most every `interval` seconds."""
+
+    def __init__(self, name: str, interval: float = 1.0):
+        self.name = name
+        self.interval = interval
+        self.start_time = time.time()
+        self.last_log = 0.0
+
+    def __call__(self, transferred: int, total: int) -> None:
+        now = time.time()
+        if now - self.last_log < self.interval and transferred < total:
+            return
+        self.last_log = now
+        elapsed = now - self.start_time
+        rate = transferred / MB / elapsed if elapsed else 0.0
+        logging.info(f"{self.name}: {transferred / MB:.1f}/{total / MB:.1f} MB ({rate:.1f} MB/s)")
+
+class ProgressCounter:
+    """Adapts ftplib's per-block callbacks to a ProgressCallback. Safe to share between threads."""
+
+    def __init__(self, total: int, transferred: int = 0, callback: Optional[ProgressCallback] = None):
+        self.total = total
+        self.transferred = transferred
+        self.callback = callback
+        self.lock = threading.Lock()
+
+    def add(self, size: int) -> None:
+        with self.lock:
+            self.transferred += size
+            if self.callback:
+                self.callback(self.transferred, self.total)
+
+def local_sha256(local_file: str) -> str:
+    digest = hashlib.sha256()
+    with open(local_file, 'rb') as local:
+        for block in iter(lambda: local.read(CHUNK_READ_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
 
 class FileTransferClient(ABC):
     @abstractmethod
@@ -13,8 +67,18 @@ class FileTransferClient(ABC):
         pass
 
     @abstractmethod
-    def upload_file(self, local_file: str, remote_file: str) -> None:
-        """Upload a file to the remote server."""
+    def upload_file(self, local_file: str, remote_file: str) -> bool:
+        """Upload a file to the remote server. Returns whether it succeeded."""
+        pass
+
+    @abstractmethod
+    def makedirs(self, remote_dir: str) -> None:
+        """Create a remote directory and its missing parents."""
+        pass
+
+    @abstractmethod
+    def is_alive(self) -> bool:
+        """Whether the connection is still usable."""
         pass
 
     @abstractmethod
@@ -28,9 +92,7 @@ class ConnectionDetails(ABC):
     port: int
     username: str
     password: Optional[str]
-    local_file: str
-    remote_file: str
-    
+
 @dataclass
 class SFTPConnectionDetails(ConnectionDetails):
     hostname: str 
@@ -38,8 +100,6 @@ class SFTPConnectionDetails(ConnectionDetails):
     username: str = ''
     password: Optional[str] = None
     ssh_key_file: Optional[str] = None  
-    local_file: str = './data.parquet'
-    remote_file: str = '/remote/path/data.parquet'
 
 @dataclass
 class FTPConnectionDetails(ConnectionDetails):
@@ -47,8 +107,6 @@ class FTPConnectionDetails(ConnectionDetails):
     port: int = 21
     username: str = ''
     password: Optional[str] = None
-    local_file: str = './data.parquet'
-    remote_file: str = '/remote/path/data.parquet'
 
 
 class FTPClient(FileTransferClient):
@@ -59,12 +117,16 @@ class FTPClient(FileTransferClient):
         self.password = connection_details.password
         self.ftp: Optional[ftplib.FTP] = None
 
+    def _login(self) -> ftplib.FTP:
+        ftp = ftplib.FTP()
+        ftp.connect(self.hostname, self.port)
+        ftp.login(self.username, self.password if self.password else '')
+        return ftp
+
     def connect(self) -> None:
         """Establish the FTP connection."""
         try:
-            self.ftp = ftplib.FTP()
-            self.ftp.connect(self.hostname, self.port)
-            self.ftp.login(self.username, self.password if self.password else '')
+            self.ftp = self._login()
             logging.info(f"Connected to {self.hostname}")
         except ftplib.error_perm as e:
             logging.error(f"FTP permission error: {e}")
@@ -73,16 +135,43 @@ class FTPClient(FileTransferClient):
         except Exception as e:
             logging.error(f"An error occurred while connecting: {e}")
 
-    def upload_file(self, local_file: str, remote_file: str) -> None:
-        """Upload a file to the remote FTP server."""
+    def _remote_size(self, remote_file: str) -> Optional[int]:
+        """Size of a remote file, or None if it doesn't exist."""
+        self.ftp.voidcmd('TYPE I')
+        try:
+            return self.ftp.size(remote_file)
+        except ftplib.error_perm:
+            return None
+
+    def upload_file(self, local_file: str, remote_file: str, blocksize: int = FTP_BLOCK_SIZE, resume: bool = False,
+                    callback: Optional[ProgressCallback] = None) -> bool:
+        """
+        Upload a file to the remote FTP server in blocks of `blocksize` bytes.
+
+        With resume, an existing smaller remote file is treated as an interrupted upload and
+        the rest is sent after a REST command.
+        """
         try:
             if self.ftp is None:
                 raise RuntimeError("FTP client is not connected. Please call connect() before uploading files.")
             if not os.path.exists(local_file):
                 raise FileNotFoundError(f"Local file {local_file} not found.")
+            size = os.path.getsize(local_file)
+            offset = (self._remote_size(remote_file) or 0) if resume else 0
+            if offset > size:
+                offset = 0
+            if offset == size and size > 0:
+                logging.info(f"File {local_file} already uploaded to {remote_file}")
+                return True
+            progress = ProgressCounter(size, offset, callback)
             with open(local_file, 'rb') as file:
-                self.ftp.storbinary(f'STOR {remote_file}', file)
+                if offset:
+                    logging.info(f"Resuming upload of {local_file} at byte {offset}")
+                    file.seek(offset)
+                self.ftp.storbinary(f'STOR {remote_file}', file, blocksize,
+                                    callback=lambda block: progress.add(len(block)), rest=offset or None)
                 logging.info(f"File {local_file} uploaded to {remote_file}")
+            return True
         except FileNotFoundError as e:
             logging.error(e)
         except RuntimeError as e:
@@ -91,6 +180,127 @@ class FTPClient(FileTransferClient):
             logging.error(f"FTP permission error: {e}")
         except Exception as e:
             logging.error(f"An error occurred during file upload: {e}")
+        return False
+
+    def download_file(self, remote_file: str, local_file: str, blocksize: int = FTP_BLOCK_SIZE, resume: bool = False,
+                      callback: Optional[ProgressCallback] = None) -> bool:
+        """
+        Download a file from the remote FTP server. With resume, an existing smaller local file
+        is continued from its size using REST.
+        """
+        try:
+            if self.ftp is None:
+                raise RuntimeError("FTP client is not connected. Please call connect() before downloading files.")
+            size = self._remote_size(remote_file)
+            if size is None:
+                raise FileNotFoundError(f"Remote file {remote_file} not found.")
+            offset = os.path.getsize(local_file) if resume and os.path.exists(local_file) else 0
+            if offset > size:
+                offset = 0
+            progress = ProgressCounter(size, offset, callback)
+            with open(local_file, 'ab' if offset else 'wb') as file:
+                if offset:
+                    logging.info(f"Resuming download of {remote_file} at byte {offset}")
+
+                def write(block: bytes) -> None:
+                    file.write(block)
+                    progress.add(len(block))
+
+                if offset < size:
+                    self.ftp.retrbinary(f'RETR {remote_file}', write, blocksize, rest=offset or None)
+            logging.info(f"File {remote_file} downloaded to {local_file}")
+            return True
+        except FileNotFoundError as e:
+            logging.error(e)
+        except RuntimeError as e:
+            logging.error(e)
+        except ftplib.error_perm as e:
+            logging.error(f"FTP permission error: {e}")
+        except Exception as e:
+            logging.error(f"An error occurred during file download: {e}")
+        return False
+
+    def _download_range(self, remote_file: str, local_file: str, start: int, end: int, blocksize: int,
+                        progress: ProgressCounter) -> None:
+        """Fetch bytes [start, end) over a separate control and data connection."""
+        ftp = self._login()
+        try:
+            ftp.voidcmd('TYPE I')
+            with open(local_file, 'r+b') as file, ftp.transfercmd(f'RETR {remote_file}', rest=start or None) as conn:
+                file.seek(start)
+                position = start
+                while position < end:
+                    block = conn.recv(min(blocksize, end - position))
+                    if not block:
+                        raise EOFError(f"Connection closed at byte {position} of {remote_file}")
+                    file.write(block)
+                    position += len(block)
+                    progress.add(len(block))
+            try:
+                # The server reports the transfer we cut short as aborted
+                ftp.voidresp()
+            except ftplib.all_errors:
+                pass
+        finally:
+            ftp.close()
+
+    def download_file_parallel(self, remote_file: str, local_file: str, connections: int = 4,
+                               blocksize: int = FTP_BLOCK_SIZE, callback: Optional[ProgressCallback] = None) -> bool:
+        """
+        Download a file as `connections` byte ranges in parallel, each over its own logged-in
+        connection that starts with REST and stops reading at the end of its range.
+        """
+        try:
+            if self.ftp is None:
+                raise RuntimeError("FTP client is not connected. Please call connect() before downloading files.")
+            size = self._remote_size(remote_file)
+            if size is None:
+                raise FileNotFoundError(f"Remote file {remote_file} not found.")
+            with open(local_file, 'wb') as file:
+                file.truncate(size)
+            range_size = max(-(-size // connections), 1)
+            progress = ProgressCounter(size, 0, callback)
+            start_time = time.time()
+            with ThreadPoolExecutor(max_workers=connections) as executor:
+                futures = [executor.submit(self._download_range, remote_file, local_file, start,
+                                           min(start + range_size, size), blocksize, progress)
+                           for start in range(0, size, range_size)]
+                for future in futures:
+                    future.result()
+            elapsed = time.time() - start_time
+            logging.info(f"File {remote_file} downloaded to {local_file} over {len(futures)} connections "
+                         f"({size / MB / elapsed if elapsed else 0.0:.1f} MB/s)")
+            return True
+        except FileNotFoundError as e:
+            logging.error(e)
+        except RuntimeError as e:
+            logging.error(e)
+        except ftplib.error_perm as e:
+            logging.error(f"FTP permission error: {e}")
+        except Exception as e:
+            logging.error(f"An error occurred during file download: {e}")
+        return False
+
+    def makedirs(self, remote_dir: str) -> None:
+        """Create a remote directory and its missing parents."""
+        path = '/' if remote_dir.startswith('/') else ''
+        for part in filter(None, remote_dir.split('/')):
+            path = f"{path.rstrip('/')}/{part}" if path else part
+            try:
+                self.ftp.mkd(path)
+            except ftplib.error_perm:
+                # Already exists (servers answer 550 for both cases)
+                pass
+
+    def is_alive(self) -> bool:
+        """Whether the control connection still answers."""
+        if self.ftp is None:
+            return False
+        try:
+            self.ftp.voidcmd('NOOP')
+            return True
+        except ftplib.all_errors:
+            return False
 
     def close(self) -> None:
         """Close the FTP connection."""
@@ -134,7 +344,7 @@ class SFTPClient(FileTransferClient):
         except Exception as e:
             logging.error(f"An error occurred while connecting: {e}")
 
-    def upload_file(self, local_file: str, remote_file: str) -> None:
+    def upload_file(self, local_file: str, remote_file: str) -> bool:
         """Upload a file to the remote SFTP server."""
         try:
             if self.sftp is None:
@@ -145,12 +355,145 @@ class SFTPClient(FileTransferClient):
                 
             self.sftp.put(local_file, remote_file)
             logging.info(f"File {local_file} uploaded to {remote_file}")
+            return True
         except FileNotFoundError as e:
             logging.error(e)
         except RuntimeError as e:
             logging.error(e)
         except Exception as e:
             logging.error(f"An error occurred during file upload: {e}")
+        return False
+
+    def makedirs(self, remote_dir: str) -> None:
+        """Create a remote directory and its missing parents."""
+        path = '/' if remote_dir.startswith('/') else ''
+        for part in filter(None, remote_dir.split('/')):
+            path = f"{path.rstrip('/')}/{part}" if path else part
+            try:
+                self.sftp.stat(path)
+            except IOError:
+                self.sftp.mkdir(path)
+
+    def is_alive(self) -> bool:
+        """Whether the SSH transport is still active."""
+        if self.sftp is None or self.client is None:
+            return False
+        transport = self.client.get_transport()
+        return transport is not None and transport.is_active()
+
+    def _resume_offset(self, part_file: str, window: int) -> int:
+        """
+        Where an interrupted chunked upload can continue. Windows are written one after another,
+        so only the window holding the last byte of the partial file may have gaps.
+        """
+        try:
+            remote_size = self.sftp.stat(part_file).st_size
+        except IOError:
+            return 0
+        return ((remote_size - 1) // window) * window if remote_size > 0 else 0
+
+    def _remote_sha256(self, remote_file: str) -> str:
+        """Hash of a remote file, using the server's check-file extension when available."""
+        with self.sftp.open(remote_file, 'r') as remote:
+            try:
+                return remote.check('sha256').hex()
+            except (IOError, paramiko.SFTPError):
+                remote.prefetch()
+                digest = hashlib.sha256()
+                for block in iter(lambda: remote.read(CHUNK_READ_SIZE), b''):
+                    digest.update(block)
+                return digest.hexdigest()
+
+    def _write_windows(self, local_file: str, part_file: str, offset: int, chunk_size: int, channels: int) -> None:
+        """
+        Writes local_file from `offset` on in windows of `channels` chunks. A window only
+        counts as written once the server acknowledged every write in it, so the next one never
+        starts while an earlier window may still have holes.
+        """
+        sessions: List[paramiko.SFTPClient] = [self.client.open_sftp() for _ in range(channels)]
+        handles = [session.open(part_file, 'r+') for session in sessions]
+        try:
+            def write_chunk(handle, position: int, data: bytes) -> None:
+                handle.seek(position)
+                handle.set_pipelined(True)
+                handle.write(data[:-1])
+                handle.flush()
+                # Pipelined writes don't wait for the server. A synchronous last write collects
+                # the status of every earlier write on this handle, raising if any failed.
+                handle.set_pipelined(False)
+                handle.write(data[-1:])
+                handle.flush()
+
+            size = os.path.getsize(local_file)
+            window = chunk_size * channels
+            with open(local_file, 'rb') as local, ThreadPoolExecutor(max_workers=channels) as executor:
+                for window_start in range(offset, size, window):
+                    local.seek(window_start)
+                    futures = []
+                    for index, handle in enumerate(handles):
+                        data = local.read(chunk_size)
+                        if not data:
+                            break
+                        futures.append(executor.submit(write_chunk, handle, window_start + index * chunk_size, data))
+                    for future in futures:
+                        future.result()
+                    logging.debug(f"Uploaded {min(window_start + window, size)}/{size} bytes of {local_file}")
+        finally:
+            for handle in handles:
+                handle.close()
+            for session in sessions:
+                session.close()
+
+    def upload_file_chunked(self, local_file: str, remote_file: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                            channels: int = 4, resume: bool = True, verify: bool = True, retries: int = 3) -> bool:
+        """
+        Upload a file through several SFTP channels with pipelined writes.
+
+        Data goes to remote_file + '.part' in windows of `channels` chunks written concurrently,
+        one channel per chunk. After a failure the client reconnects and continues from the
+        remote partial size (up to `retries` times, and on later calls when resume is set; the
+        same chunk_size and channels must be used). The result is checked against a SHA-256 of
+        the local file before being renamed to remote_file.
+        """
+        part_file = f'{remote_file}.part'
+        window = chunk_size * channels
+        try:
+            if self.sftp is None:
+                raise RuntimeError("SFTP client is not connected. Please call connect() before uploading files.")
+            if not os.path.exists(local_file):
+                raise FileNotFoundError(f"Local file {local_file} not found.")
+            local_digest = local_sha256(local_file)
+        except (FileNotFoundError, RuntimeError) as e:
+            logging.error(e)
+            return False
+
+        offset = self._resume_offset(part_file, window) if resume else 0
+        for attempt in range(retries + 1):
+            try:
+                if offset == 0:
+                    self.sftp.open(part_file, 'w').close()
+                elif attempt == 0:
+                    logging.info(f"Resuming upload of {local_file} at byte {offset}")
+                self._write_windows(local_file, part_file, offset, chunk_size, channels)
+                if verify and self._remote_sha256(part_file) != local_digest:
+                    if offset == 0:
+                        raise IOError(f"Checksum mismatch after uploading {local_file}")
+                    logging.warning(f"Checksum mismatch after resuming {local_file}, restarting from zero")
+                    offset = 0
+                    continue
+                self.sftp.posix_rename(part_file, remote_file)
+                logging.info(f"File {local_file} uploaded to {remote_file}")
+                return True
+            except Exception as e:
+                logging.error(f"An error occurred during chunked upload (attempt {attempt + 1}): {e}")
+                if attempt == retries:
+                    break
+                self.close()
+                self.connect()
+                if self.sftp is None:
+                    continue
+                offset = self._resume_offset(part_file, window)
+        return False
 
     def close(self) -> None:
         """Close the SFTP and SSH connection."""
@@ -163,6 +506,118 @@ class SFTPClient(FileTransferClient):
                 logging.info("SSH connection closed.")
         except Exception as e:
             logging.error(f"Error closing connection: {e}")
+        finally:
+            self.sftp = None
+            self.client = None
+
+def create_client(connection_details: ConnectionDetails) -> FileTransferClient:
+    if isinstance(connection_details, SFTPConnectionDetails):
+        return SFTPClient(connection_details)
+    if isinstance(connection_details, FTPConnectionDetails):
+        return FTPClient(connection_details)
+    raise TypeError(f"Unsupported connection details: {type(connection_details).__name__}")
+
+class TransferPool:
+    """
+    Keeps `size` authenticated FTP/SFTP sessions open and spreads batches of uploads across
+    them, so shipping many small files doesn't pay a connect and login per file.
+
+    Each session uploads one file at a time, taking the largest remaining file whenever it
+    becomes free, which keeps the sessions evenly loaded. Use it as a context manager or
+    call open() and close().
+    """
+
+    def __init__(self, connection_details: ConnectionDetails, size: int = 4):
+        self.connection_details = connection_details
+        self.size = size
+        self.clients: List[FileTransferClient] = []
+
+    def open(self) -> None:
+        while len(self.clients) < self.size:
+            client = create_client(self.connection_details)
+            client.connect()
+            if not client.is_alive():
+                self.close()
+                raise ConnectionError(f"Could not open session to {self.connection_details.hostname}")
+            self.clients.append(client)
+        logging.info(f"Opened {len(self.clients)} sessions to {self.connection_details.hostname}")
+
+    def close(self) -> None:
+        for client in self.clients:
+            client.close()
+        self.clients = []
+
+    def __enter__(self) -> 'TransferPool':
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def _reconnect(self, client: FileTransferClient) -> None:
+        client.close()
+        client.connect()
+
+    def _drain(self, client: FileTransferClient, jobs: queue.Queue) -> List[Tuple[str, int, bool]]:
+        results = []
+        while True:
+            try:
+                size, local_file, remote_file = jobs.get_nowait()
+            except queue.Empty:
+                return results
+            uploaded = client.upload_file(local_file, remote_file)
+            if not uploaded and not client.is_alive():
+                # The session dropped, not the file: retry it once on a fresh connection
+                self._reconnect(client)
+                uploaded = client.upload_file(local_file, remote_file)
+            results.append((local_file, size, uploaded))
+
+    def upload_batch(self, files: Iterable[Tuple[str, str]]) -> TransferReport:
+        """Upload (local_file, remote_file) pairs across the pooled sessions."""
+        self.open()
+        report = TransferReport()
+        batch = []
+        for local_file, remote_file in files:
+            if os.path.exists(local_file):
+                batch.append((os.path.getsize(local_file), local_file, remote_file))
+            else:
+                report.failed.append((local_file, f"Local file {local_file} not found."))
+        jobs: queue.Queue = queue.Queue()
+        for job in sorted(batch, key=lambda job: job[0], reverse=True):
+            jobs.put(job)
+
+        start_time = time.time()
+        for client in self.clients:
+            if not client.is_alive():
+                self._reconnect(client)
+        with ThreadPoolExecutor(max_workers=len(self.clients)) as executor:
+            futures = [executor.submit(self._drain, client, jobs) for client in self.clients]
+            for future in futures:
+                for local_file, size, uploaded in future.result():
+                    if uploaded:
+                        report.transferred.append(local_file)
+                        report.bytes_transferred += size
+                    else:
+                        report.failed.append((local_file, "Upload failed, see the log for details."))
+        report.seconds = time.time() - start_time
+        logging.info(f"Uploaded {len(report.transferred)} files ({report.bytes_transferred / MB:.1f} MB) over "
+                     f"{len(self.clients)} sessions in {report.seconds:.2f}s ({report.throughput_mb_s:.1f} MB/s), "
+                     f"failed {len(report.failed)}")
+        return report
+
+    def upload_directory(self, local_dir: str, remote_dir: str) -> TransferReport:
+        """Upload every file under local_dir to remote_dir, keeping the relative layout."""
+        self.open()
+        files = []
+        remote_dirs = set()
+        for directory, _, names in os.walk(local_dir):
+            relative = os.path.relpath(directory, local_dir).replace(os.sep, '/')
+            target_dir = remote_dir.rstrip('/') if relative == '.' else f"{remote_dir.rstrip('/')}/{relative}"
+            remote_dirs.add(target_dir or '/')
+            files.extend((os.path.join(directory, name), f"{target_dir}/{name}") for name in sorted(names))
+        for target_dir in sorted(remote_dirs):
+            self.clients[0].makedirs(target_dir)
+        return self.upload_batch(files)
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -170,29 +625,21 @@ if __name__ == "__main__":
     sftp_details: ConnectionDetails = SFTPConnectionDetails(
         hostname='example.com',
         username='username',
-        password='password',
-        local_file='./data.parquet',
-        remote_file='/remote/path/data.parquet'
+        password='password'
     )
 
-    # SFTP client
-    sftp_client: FileTransferClient = SFTPClient(sftp_details)
-    sftp_client.connect()
-    sftp_client.upload_file(sftp_details.local_file, sftp_details.remote_file)
-    sftp_client.close()
+    # SFTP sessions, reused for every file in the batch
+    with TransferPool(sftp_details, size=4) as sftp_pool:
+        sftp_pool.upload_batch([('./data.parquet', '/remote/path/data.parquet')])
 
     # Connection details for FTP
     ftp_details: ConnectionDetails = FTPConnectionDetails(
         hostname='example.com',
         username='username',
-        password='password',
-        local_file='./data.parquet',
-        remote_file='/remote/path/data.parquet'
+        password='password'
     )
 
-    # FTP client
-    ftp_client: FileTransferClient = FTPClient(ftp_details)
-    ftp_client.connect()
-    ftp_client.upload_file(ftp_details.local_file, ftp_details.remote_file)
-    ftp_client.close()
+    # FTP sessions
+    with TransferPool(ftp_details, size=4) as ftp_pool:
+        ftp_pool.upload_batch([('./data.parquet', '/remote/path/data.parquet')])
     
@@ -1,6 +1,13 @@
-import unittest, logging
+import unittest, logging, os, tempfile, threading
 from unittest.mock import patch, MagicMock
-from main_ftp_sftp import FTPConnectionDetails, FTPClient, FileTransferClient, SFTPClient, SFTPConnectionDetails
+from pyftpdlib.authorizers import DummyAuthorizer
+from pyftpdlib.handlers import FTPHandler
+from pyftpdlib.servers import ThreadedFTPServer
+from main_ftp_sftp import FTP_BLOCK_SIZE, FTPConnectionDetails, FTPClient, FileTransferClient, SFTPClient, SFTPConnectionDetails, TransferPool
+from sftp_stub_server import StubSFTPServerThread
+
+KB = 1024
+MB = 1024 * KB
 
 class TestFileTransferClients(unittest.TestCase):
 
@@ -12,23 +19,25 @@ class TestFileTransferClients(unittest.TestCase):
         ftp_details = FTPConnectionDetails(
             hostname='test_ftp_server',
             username='test_user',
-            password='test_pass',
-            local_file='./test_file.txt',
-            remote_file='/remote/path/test_file.txt'
+            password='test_pass'
         )
         
-        # Mocking os.path.exists
-        with patch('os.path.exists') as mock_exists:
+        # Mocking os.path.exists; the upload still opens the file, so it has to be real
+        with patch('os.path.exists') as mock_exists, tempfile.TemporaryDirectory() as tmp_dir:
             mock_exists.return_value = True
+            local_file = os.path.join(tmp_dir, 'test_file.txt')
+            with open(local_file, 'w') as file:
+                file.write('test')
             
             ftp_client = FTPClient(ftp_details)
             ftp_client.connect()
-            ftp_client.upload_file(ftp_details.local_file, ftp_details.remote_file)
+            ftp_client.upload_file(local_file, '/remote/path/test_file.txt')
             ftp_client.close()
             
             mock_ftp.connect.assert_called_once_with('test_ftp_server', 21)
             mock_ftp.login.assert_called_once_with('test_user', 'test_pass')
-            mock_ftp.storbinary.assert_called_once_with('STOR /remote/path/test_file.txt', unittest.mock.ANY)
+            mock_ftp.storbinary.assert_called_once_with('STOR /remote/path/test_file.txt', unittest.mock.ANY, FTP_BLOCK_SIZE,
+                                                        callback=unittest.mock.ANY, rest=None)
             mock_ftp.quit.assert_called_once()
 
     @patch('paramiko.SSHClient')
@@ -40,9 +49,7 @@ class TestFileTransferClients(unittest.TestCase):
         sftp_details = SFTPConnectionDetails(
             hostname='test_sftp_server',
             username='test_user',
-            password='test_pass',
-            local_file='./test_file.txt',
-            remote_file='/remote/path/test_file.txt'
+            password='test_pass'
         )
         
         # Mocking os.path.exists
@@ -50,11 +57,192 @@ class TestFileTransferClients(unittest.TestCase):
             mock_exists.return_value = True
             sftp_client = SFTPClient(sftp_details)
             sftp_client.connect()
-            sftp_client.upload_file(sftp_details.local_file, sftp_details.remote_file)
+            sftp_client.upload_file('./test_file.txt', '/remote/path/test_file.txt')
             sftp_client.close()
             
             mock_ssh_client.set_missing_host_key_policy.assert_called_once()
 
+class TestSFTPChunkedUpload(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.remote_root = os.path.join(self.tmp_dir.name, 'remote')
+        os.makedirs(self.remote_root)
+        self.server = StubSFTPServerThread(self.remote_root)
+        self.content = os.urandom(3 * MB + 123)
+        self.local_file = os.path.join(self.tmp_dir.name, 'data.parquet')
+        with open(self.local_file, 'wb') as file:
+            file.write(self.content)
+        self.client = SFTPClient(SFTPConnectionDetails(
+            hostname='127.0.0.1',
+            port=self.server.port,
+            username='test_user',
+            password='test_pass'
+        ))
+        self.client.connect()
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+        self.tmp_dir.cleanup()
+
+    def remote_content(self, name: str = 'data.parquet') -> bytes:
+        with open(os.path.join(self.remote_root, name), 'rb') as file:
+            return file.read()
+
+    def write_partial(self, data: bytes) -> None:
+        with open(os.path.join(self.remote_root, 'data.parquet.part'), 'wb') as file:
+            file.write(data)
+
+    def test_chunked_upload(self):
+        self.assertTrue(self.client.upload_file_chunked(self.local_file, '/data.parquet', chunk_size=256 * KB, channels=4))
+        self.assertEqual(self.remote_content(), self.content)
+        self.assertFalse(os.path.exists(os.path.join(self.remote_root, 'data.parquet.part')))
+
+    def test_resumes_from_remote_partial_size(self):
+        # 2.5 MB already uploaded with 1 MB windows: the window holding the last byte is redone.
+        self.write_partial(self.content[:2 * MB + 512 * KB])
+        self.assertTrue(self.client.upload_file_chunked(self.local_file, '/data.parquet', chunk_size=256 * KB, channels=4))
+        self.assertEqual(self.remote_content(), self.content)
+        self.assertEqual(self.server.state['bytes_written'], len(self.content) - 2 * MB)
+
+    def test_corrupt_partial_restarts_from_zero(self):
+        self.write_partial(os.urandom(2 * MB + 512 * KB))
+        self.assertTrue(self.client.upload_file_chunked(self.local_file, '/data.parquet', chunk_size=256 * KB, channels=4))
+        self.assertEqual(self.remote_content(), self.content)
+
+    def test_reconnects_and_resumes_after_dropped_connection(self):
+        self.server.state['fail_after_bytes'] = 1 * MB + 512 * KB
+        self.assertTrue(self.client.upload_file_chunked(self.local_file, '/data.parquet', chunk_size=256 * KB,
+                                                        channels=4, retries=2))
+        self.assertEqual(self.remote_content(), self.content)
+        self.assertLess(self.server.state['bytes_written'], 2 * len(self.content))
+
+    def test_interrupted_mid_window_leaves_no_holes(self):
+        # Channel 0 is slow on the second window while channel 2 reaches the third window's
+        # drop point; the third window must not start before the second is acknowledged.
+        self.server.state['slow_writes'] = (1 * MB, 1 * MB + 256 * KB, 0.05)
+        self.server.state['fail_at_offset'] = 2 * MB + 512 * KB
+        self.assertTrue(self.client.upload_file_chunked(self.local_file, '/data.parquet', chunk_size=256 * KB,
+                                                        channels=4, retries=2, verify=False))
+        self.assertEqual(self.remote_content(), self.content)
+
+class TestFTPTransfers(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.remote_root = os.path.join(self.tmp_dir.name, 'remote')
+        os.makedirs(self.remote_root)
+        authorizer = DummyAuthorizer()
+        authorizer.add_user('test_user', 'test_pass', self.remote_root, perm='elradfmwMT')
+        handler = type('TestFTPHandler', (FTPHandler,), {'authorizer': authorizer})
+        self.server = ThreadedFTPServer(('127.0.0.1', 0), handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, kwargs={'timeout': 0.1}, daemon=True)
+        self.thread.start()
+        self.content = os.urandom(2 * MB + 321)
+        self.local_file = os.path.join(self.tmp_dir.name, 'data.parquet')
+        with open(self.local_file, 'wb') as file:
+            file.write(self.content)
+        self.client = FTPClient(FTPConnectionDetails(
+            hostname='127.0.0.1',
+            port=self.server.socket.getsockname()[1],
+            username='test_user',
+            password='test_pass'
+        ))
+        self.client.connect()
+
+    def tearDown(self):
+        self.client.close()
+        self.server.close_all()
+        self.thread.join()
+        self.tmp_dir.cleanup()
+
+    def read(self, path: str) -> bytes:
+        with open(path, 'rb') as file:
+            return file.read()
+
+    def test_upload_reports_progress(self):
+        progress = []
+        self.assertTrue(self.client.upload_file(self.local_file, '/data.parquet', blocksize=64 * KB,
+                                                callback=lambda done, total: progress.append((done, total))))
+        self.assertEqual(self.read(os.path.join(self.remote_root, 'data.parquet')), self.content)
+        self.assertEqual(len(progress), -(-len(self.content) // (64 * KB)))
+        self.assertEqual(progress[-1], (len(self.content), len(self.content)))
+
+    def test_upload_resumes_with_rest(self):
+        with open(os.path.join(self.remote_root, 'data.parquet'), 'wb') as file:
+            file.write(self.content[:MB])
+        progress = []
+        self.assertTrue(self.client.upload_file(self.local_file, '/data.parquet', resume=True,
+                                                callback=lambda done, total: progress.append(done)))
+        self.assertEqual(self.read(os.path.join(self.remote_root, 'data.parquet')), self.content)
+        self.assertEqual(progress[0], MB + FTP_BLOCK_SIZE)
+
+    def test_download_resumes_with_rest(self):
+        with open(os.path.join(self.remote_root, 'data.parquet'), 'wb') as file:
+            file.write(self.content)
+        target = os.path.join(self.tmp_dir.name, 'download.parquet')
+        with open(target, 'wb') as file:
+            file.write(self.content[:MB + 17])
+        self.assertTrue(self.client.download_file('/data.parquet', target, resume=True))
+        self.assertEqual(self.read(target), self.content)
+
+    def test_parallel_download(self):
+        with open(os.path.join(self.remote_root, 'data.parquet'), 'wb') as file:
+            file.write(self.content)
+        target = os.path.join(self.tmp_dir.name, 'download.parquet')
+        progress = []
+        self.assertTrue(self.client.download_file_parallel('/data.parquet', target, connections=4, blocksize=64 * KB,
+                                                           callback=lambda done, total: progress.append(done)))
+        self.assertEqual(self.read(target), self.content)
+        self.assertEqual(progress[-1], len(self.content))
+
+class TestTransferPool(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.remote_root = os.path.join(self.tmp_dir.name, 'remote')
+        self.local_dir = os.path.join(self.tmp_dir.name, 'local')
+        os.makedirs(self.remote_root)
+        os.makedirs(os.path.join(self.local_dir, 'year=2024', 'month=01'))
+        self.files = {f'year=2024/month=01/part-{i}.parquet': os.urandom(1024 * (i + 1)) for i in range(12)}
+        self.files['summary.parquet'] = os.urandom(256 * KB)
+        for name, content in self.files.items():
+            with open(os.path.join(self.local_dir, name), 'wb') as file:
+                file.write(content)
+        self.server = StubSFTPServerThread(self.remote_root)
+        self.details = SFTPConnectionDetails(
+            hostname='127.0.0.1',
+            port=self.server.port,
+            username='test_user',
+            password='test_pass'
+        )
+
+    def tearDown(self):
+        self.server.stop()
+        self.tmp_dir.cleanup()
+
+    def test_upload_directory_reuses_sessions(self):
+        with TransferPool(self.details, size=3) as pool:
+            report = pool.upload_directory(self.local_dir, '/upload/dataset')
+            second = pool.upload_batch([(os.path.join(self.local_dir, 'summary.parquet'), '/upload/copy.parquet')])
+        self.assertEqual(len(report.transferred), len(self.files))
+        self.assertEqual(report.failed, [])
+        self.assertEqual(report.bytes_transferred, sum(len(content) for content in self.files.values()))
+        self.assertEqual(second.transferred, [os.path.join(self.local_dir, 'summary.parquet')])
+        self.assertEqual(len(self.server.transports), 3)
+        for name, content in self.files.items():
+            with open(os.path.join(self.remote_root, 'upload', 'dataset', name), 'rb') as file:
+                self.assertEqual(file.read(), content)
+
+    def test_missing_files_are_reported(self):
+        missing = os.path.join(self.local_dir, 'missing.parquet')
+        with TransferPool(self.details, size=2) as pool:
+            report = pool.upload_batch([(missing, '/missing.parquet'),
+                                        (os.path.join(self.local_dir, 'summary.parquet'), '/summary.parquet')])
+        self.assertEqual(report.transferred, [os.path.join(self.local_dir, 'summary.parquet')])
+        self.assertEqual([local_file for local_file, _ in report.failed], [missing])
+
 # Setup logging
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
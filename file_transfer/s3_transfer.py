@@ -1,23 +1,216 @@
 import boto3
-from botocore.exceptions import NoCredentialsError, PartialCredentialsError
-from typing import Optional
+import hashlib, io, math, mmap, os, threading, time
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError, NoCredentialsError, PartialCredentialsError
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 from dataclasses import dataclass
+from transfer_report import TransferReport
+
+MB = 1024 * 1024
 
 @dataclass(frozen=True)
 class S3Config:
     aws_access_key_id: Optional[str] = None
     aws_secret_access_key: Optional[str] = None
     region_name: Optional[str] = None
+    endpoint_url: Optional[str] = None
+    max_pool_connections: int = 50
+
+@dataclass(frozen=True)
+class TransferSettings:
+    """Multipart tuning passed to boto3's TransferConfig, plus how many files move at once."""
+    multipart_threshold: int = 8 * MB
+    multipart_chunksize: int = 8 * MB
+    max_concurrency: int = 10
+    max_files_in_flight: int = 4
+
+    def transfer_config(self) -> TransferConfig:
+        return TransferConfig(
+            multipart_threshold=self.multipart_threshold,
+            multipart_chunksize=self.multipart_chunksize,
+            max_concurrency=self.max_concurrency,
+            use_threads=True
+        )
+
+HASH_BLOCK_SIZE = 1 * MB
+
+def _multipart_etags(file_path: str, chunksizes: Iterable[int]) -> Dict[int, str]:
+    """
+    Multipart ETags of a file for several part sizes, from a single read of the file in
+    HASH_BLOCK_SIZE blocks. Each part is hashed incrementally, so memory stays bounded.
+    """
+    # Per part size: [md5 of the current part, bytes hashed into it, digests of finished parts]
+    states = {chunksize: [hashlib.md5(), 0, []] for chunksize in chunksizes}
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b''):
+            for chunksize, state in states.items():
+                view = memoryview(block)
+                while view:
+                    take = min(len(view), chunksize - state[1])
+                    state[0].update(view[:take])
+                    state[1] += take
+                    view = view[take:]
+                    if state[1] == chunksize:
+                        state[2].append(state[0].digest())
+                        state[0], state[1] = hashlib.md5(), 0
+    etags = {}
+    for chunksize, (part, hashed, digests) in states.items():
+        if hashed:
+            digests.append(part.digest())
+        etags[chunksize] = f'"{hashlib.md5(b"".join(digests)).hexdigest()}-{len(digests)}"'
+    return etags
+
+def _single_part_etag(file_path: str) -> str:
+    digest = hashlib.md5()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return f'"{digest.hexdigest()}"'
+
+def local_etag(file_path: str, multipart_threshold: int, multipart_chunksize: int) -> str:
+    """The ETag S3 assigns to this file when uploaded with the given multipart settings."""
+    if os.path.getsize(file_path) < multipart_threshold:
+        return _single_part_etag(file_path)
+    return _multipart_etags(file_path, [multipart_chunksize])[multipart_chunksize]
+
+def etag_matches(file_path: str, etag: str, multipart_chunksize: int = 8 * MB, max_candidates: int = 4) -> bool:
+    """
+    Compares a local file with an S3 ETag. The part size of a multipart ETag is unknown, so
+    the configured chunk size is tried along with whole-MB part sizes that yield the same
+    number of parts (at most max_candidates of them), all in one pass over the file.
+    """
+    if '-' not in etag:
+        return _single_part_etag(file_path) == etag
+    parts = int(etag.strip('"').split('-')[1])
+    size = os.path.getsize(file_path)
+    candidates = [multipart_chunksize]
+    chunksize = math.ceil(size / parts / MB) * MB
+    while len(candidates) <= max_candidates and chunksize > 0 and math.ceil(size / chunksize) == parts:
+        if chunksize != multipart_chunksize:
+            candidates.append(chunksize)
+        chunksize += MB
+    return etag in _multipart_etags(file_path, candidates).values()
+
+class S3MultipartWriter(io.RawIOBase):
+    """
+    Write-only file object backed by an S3 multipart upload.
+
+    Bytes are buffered until part_size, then uploaded as a part on a thread pool while
+    writing continues; at most max_in_flight parts are pending, so memory stays around
+    part_size * (max_in_flight + 1). Data that never fills a part is sent with one
+    put_object. close() completes the upload; abort() (or an exception inside a with block)
+    cancels it.
+    """
+
+    def __init__(self, s3, bucket_name: str, object_name: str, part_size: int = 8 * MB, max_in_flight: int = 4):
+        if part_size < 5 * MB:
+            raise ValueError("S3 parts other than the last must be at least 5 MB")
+        self.s3 = s3
+        self.bucket_name = bucket_name
+        self.object_name = object_name
+        self.part_size = part_size
+        self.buffer = bytearray()
+        self.position = 0
+        self.upload_id: Optional[str] = None
+        self.parts: List[Tuple[int, Future]] = []
+        self.slots = threading.Semaphore(max_in_flight)
+        self.executor = ThreadPoolExecutor(max_workers=max_in_flight)
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def write(self, data) -> int:
+        if self.closed:
+            raise ValueError("write to closed S3MultipartWriter")
+        self.buffer += data
+        self.position += len(data)
+        while len(self.buffer) >= self.part_size:
+            self._submit_part(bytes(self.buffer[:self.part_size]))
+            del self.buffer[:self.part_size]
+        return len(data)
+
+    def _submit_part(self, body: bytes) -> None:
+        if self.upload_id is None:
+            self.upload_id = self.s3.create_multipart_upload(Bucket=self.bucket_name, Key=self.object_name)['UploadId']
+        part_number = len(self.parts) + 1
+        self.slots.acquire()
+        future = self.executor.submit(self._upload_part, part_number, body)
+        future.add_done_callback(lambda _: self.slots.release())
+        self.parts.append((part_number, future))
+
+    def _upload_part(self, part_number: int, body: bytes) -> str:
+        response = self.s3.upload_part(Bucket=self.bucket_name, Key=self.object_name, UploadId=self.upload_id,
+                                       PartNumber=part_number, Body=body)
+        return response['ETag']
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            if self.upload_id is None:
+                self.s3.put_object(Bucket=self.bucket_name, Key=self.object_name, Body=bytes(self.buffer))
+            else:
+                if self.buffer:
+                    self._submit_part(bytes(self.buffer))
+                parts = [{'PartNumber': number, 'ETag': future.result()} for number, future in self.parts]
+                self.s3.complete_multipart_upload(Bucket=self.bucket_name, Key=self.object_name,
+                                                  UploadId=self.upload_id, MultipartUpload={'Parts': parts})
+        except Exception:
+            self.abort()
+            raise
+        finally:
+            self.buffer = bytearray()
+            self.executor.shutdown(wait=True)
+            super().close()
+
+    def abort(self) -> None:
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        if self.upload_id is not None:
+            self.s3.abort_multipart_upload(Bucket=self.bucket_name, Key=self.object_name, UploadId=self.upload_id)
+            self.upload_id = None
+        self.buffer = bytearray()
+        super().close()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+class KeepOpenStream(io.RawIOBase):
+    """Forwards writes to a sink but leaves closing it to its owner (pyarrow closes its sink)."""
+
+    def __init__(self, sink: io.RawIOBase):
+        self.sink = sink
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.sink.tell()
+
+    def write(self, data) -> int:
+        return self.sink.write(data)
 
 class S3Client:
     
     def __init__(self, config: S3Config):
-           self.s3 = boto3.client(
-               's3',
-               aws_access_key_id=config.aws_access_key_id,
-               aws_secret_access_key=config.aws_secret_access_key,
-               region_name=config.region_name
-           ) 
+        self.s3 = boto3.client(
+            's3',
+            aws_access_key_id=config.aws_access_key_id,
+            aws_secret_access_key=config.aws_secret_access_key,
+            region_name=config.region_name,
+            endpoint_url=config.endpoint_url,
+            config=Config(max_pool_connections=config.max_pool_connections)
+        )
 
     def upload_parquet_to_s3(self, bucket_name: str, file_path: str, object_name: str) -> None:
         """Upload a file to S3 bucket."""
@@ -33,6 +226,186 @@ class S3Client:
         except Exception as e:
             print(f"An error occurred: {e}")
 
+    def is_unchanged(self, bucket_name: str, file_path: str, object_name: str, settings: TransferSettings) -> bool:
+        """True when the object exists with the same size and ETag as the local file."""
+        try:
+            head = self.s3.head_object(Bucket=bucket_name, Key=object_name)
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+        if head['ContentLength'] != os.path.getsize(file_path):
+            return False
+        return head['ETag'] == local_etag(file_path, settings.multipart_threshold, settings.multipart_chunksize)
+
+    def upload_directory(self, bucket_name: str, local_dir: str, prefix: str = '',
+                         settings: TransferSettings = TransferSettings(), skip_unchanged: bool = True) -> TransferReport:
+        """
+        Uploads every file under local_dir to s3://bucket_name/prefix/<relative path>.
+
+        Up to max_files_in_flight files upload at once, each split into parts by boto3
+        according to settings. Objects whose size and ETag already match are skipped.
+        """
+        transfer_config = settings.transfer_config()
+        report = TransferReport()
+        jobs = []
+        for directory, _, files in os.walk(local_dir):
+            for name in sorted(files):
+                file_path = os.path.join(directory, name)
+                relative = os.path.relpath(file_path, local_dir).replace(os.sep, '/')
+                jobs.append((file_path, f"{prefix.rstrip('/')}/{relative}" if prefix else relative))
+
+        def upload(job: Tuple[str, str]) -> Tuple[str, Optional[str], bool]:
+            file_path, object_name = job
+            try:
+                if skip_unchanged and self.is_unchanged(bucket_name, file_path, object_name, settings):
+                    return file_path, None, False
+                self.s3.upload_file(file_path, bucket_name, object_name, Config=transfer_config)
+                return file_path, None, True
+            except Exception as e:
+                return file_path, str(e), False
+
+        start_time = time.time()
+        with ThreadPoolExecutor(max_workers=settings.max_files_in_flight) as executor:
+            for file_path, error, uploaded in executor.map(upload, jobs):
+                if error is not None:
+                    report.failed.append((file_path, error))
+                elif uploaded:
+                    report.transferred.append(file_path)
+                    report.bytes_transferred += os.path.getsize(file_path)
+                else:
+                    report.skipped.append(file_path)
+        report.seconds = time.time() - start_time
+        print(f"Uploaded {len(report.transferred)} files ({report.bytes_transferred / MB:.1f} MB) in "
+              f"{report.seconds:.2f}s ({report.throughput_mb_s:.1f} MB/s), skipped {len(report.skipped)}, "
+              f"failed {len(report.failed)}")
+        for file_path, error in report.failed:
+            print(f"An error occurred uploading {file_path}: {error}")
+        return report
+
+    def write_parquet_to_s3(self, bucket_name: str, object_name: str,
+                            data: Union[pd.DataFrame, pa.Table, Iterable[pa.RecordBatch]],
+                            schema: Optional[pa.Schema] = None, row_group_size: int = 128 * 1024,
+                            part_size: int = 8 * MB, max_in_flight: int = 4,
+                            writer_options: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Encodes data as Parquet and streams it into s3://bucket_name/object_name without a
+        local file. A record batch iterator is consumed lazily; schema defaults to the table's
+        (or DataFrame's), else the first batch's. Empty tables and DataFrames write a valid
+        Parquet object with no rows. Returns the object size in bytes.
+        """
+        if isinstance(data, pd.DataFrame):
+            data = pa.Table.from_pandas(data, schema=schema, preserve_index=False)
+        if isinstance(data, pa.Table) and schema is None:
+            schema = data.schema
+        batches = iter(data.to_batches(max_chunksize=row_group_size) if isinstance(data, pa.Table) else data)
+        first = next(batches, None)
+        if schema is None:
+            if first is None:
+                raise ValueError("Cannot infer a Parquet schema from an empty batch iterator")
+            schema = first.schema
+        start_time = time.time()
+        with S3MultipartWriter(self.s3, bucket_name, object_name, part_size, max_in_flight) as sink:
+            with pq.ParquetWriter(KeepOpenStream(sink), schema, **(writer_options or {})) as writer:
+                for batch in ([first] if first is not None else []):
+                    writer.write_batch(batch, row_group_size=row_group_size)
+                for batch in batches:
+                    writer.write_batch(batch, row_group_size=row_group_size)
+            size = sink.tell()
+        elapsed = time.time() - start_time
+        print(f"Streamed {size / MB:.1f} MB of Parquet to s3://{bucket_name}/{object_name} in {elapsed:.2f}s")
+        return size
+
+    def download_file(self, bucket_name: str, object_name: str, file_path: str,
+                      chunk_size: int = 8 * MB, max_concurrency: int = 8) -> int:
+        """
+        Downloads an object with parallel byte-range GETs written straight into a
+        preallocated, memory-mapped file, then renames it into place. Returns the size.
+        Every range is pinned to the ETag seen up front, so an object overwritten mid-download
+        fails with a ClientError (412 PreconditionFailed) instead of mixing two versions.
+        """
+        head = self.s3.head_object(Bucket=bucket_name, Key=object_name)
+        size, etag = head['ContentLength'], head['ETag']
+        os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+        temp_path = f'{file_path}.part'
+        try:
+            with open(temp_path, 'wb+') as file:
+                file.truncate(size)
+                if size:
+                    with mmap.mmap(file.fileno(), size) as mm:
+                        def fetch(start: int) -> None:
+                            end = min(start + chunk_size, size) - 1
+                            body = self.s3.get_object(Bucket=bucket_name, Key=object_name, IfMatch=etag,
+                                                      Range=f'bytes={start}-{end}')['Body']
+                            mm[start:end + 1] = body.read()
+
+                        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+                            list(executor.map(fetch, range(0, size, chunk_size)))
+                        mm.flush()
+            os.replace(temp_path, file_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return size
+
+    def list_prefix(self, bucket_name: str, prefix: str = '', max_workers: int = 8) -> List[Dict[str, Any]]:
+        """
+        Lists every object under prefix. Each '/'-delimited sub-prefix is paginated on its own
+        thread, so wide key trees are listed concurrently instead of one page at a time.
+        """
+        objects: List[Dict[str, Any]] = []
+
+        def list_level(level_prefix: str) -> List[str]:
+            children = []
+            for page in self.s3.get_paginator('list_objects_v2').paginate(Bucket=bucket_name, Prefix=level_prefix, Delimiter='/'):
+                objects.extend(page.get('Contents', []))
+                children.extend(common['Prefix'] for common in page.get('CommonPrefixes', []))
+            return children
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = {executor.submit(list_level, prefix)}
+            while pending:
+                future = pending.pop()
+                pending.update(executor.submit(list_level, child) for child in future.result())
+        return sorted(objects, key=lambda obj: obj['Key'])
+
+    def sync_prefix(self, bucket_name: str, prefix: str, local_dir: str, settings: TransferSettings = TransferSettings(),
+                    max_workers: int = 8) -> TransferReport:
+        """
+        Mirrors s3://bucket_name/prefix into local_dir, downloading only objects whose size or
+        ETag differ from the local copy. Large objects use ranged parallel downloads.
+        """
+        report = TransferReport()
+        start_time = time.time()
+        objects = [obj for obj in self.list_prefix(bucket_name, prefix, max_workers) if not obj['Key'].endswith('/')]
+
+        def sync(obj: Dict[str, Any]) -> Tuple[str, Optional[str], bool]:
+            relative = obj['Key'][len(prefix):].lstrip('/')
+            file_path = os.path.join(local_dir, *relative.split('/'))
+            try:
+                if os.path.exists(file_path) and os.path.getsize(file_path) == obj['Size'] \
+                        and etag_matches(file_path, obj['ETag'], settings.multipart_chunksize):
+                    return file_path, None, False
+                self.download_file(bucket_name, obj['Key'], file_path, settings.multipart_chunksize, settings.max_concurrency)
+                return file_path, None, True
+            except Exception as e:
+                return file_path, str(e), False
+
+        with ThreadPoolExecutor(max_workers=settings.max_files_in_flight) as executor:
+            for file_path, error, downloaded in executor.map(sync, objects):
+                if error is not None:
+                    report.failed.append((file_path, error))
+                elif downloaded:
+                    report.transferred.append(file_path)
+                    report.bytes_transferred += os.path.getsize(file_path)
+                else:
+                    report.skipped.append(file_path)
+        report.seconds = time.time() - start_time
+        print(f"Downloaded {len(report.transferred)} files ({report.bytes_transferred / MB:.1f} MB) in "
+              f"{report.seconds:.2f}s ({report.throughput_mb_s:.1f} MB/s), skipped {len(report.skipped)}, "
+              f"failed {len(report.failed)}")
+        return report
+
     def set_lifecycle_policy(self, bucket_name: str) -> None:
         """Set a lifecycle policy for the S3 bucket."""
         lifecycle_policy = {
@@ -77,4 +450,5 @@ if __name__ == "__main__":
     object_name = 'folder/data.parquet'
     
     s3_client.upload_parquet_to_s3(bucket_name, file_path, object_name)
+    s3_client.upload_directory(bucket_name, '../pandas/partitions', prefix='partitions')
     s3_client.set_lifecycle_policy(bucket_name)
\ No newline at end of file
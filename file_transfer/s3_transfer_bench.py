@@ -0,0 +1,56 @@
+import argparse, contextlib, logging, os, tempfile, time
+from s3_transfer import MB, S3Client, S3Config, TransferSettings
+
+def s3_backend(endpoint_url: str):
+    """A real endpoint (e.g. MinIO) when given, otherwise moto's in-process stub."""
+    if endpoint_url:
+        return contextlib.nullcontext()
+    try:
+        from moto import mock_aws
+    except ImportError:
+        from moto import mock_s3 as mock_aws
+    return mock_aws()
+
+def timed(name: str, size: int, func) -> None:
+    start_time = time.time()
+    func()
+    elapsed = time.time() - start_time
+    logging.info(f"{name}: {size / MB:.0f} MB in {elapsed:.2f}s ({size / MB / elapsed:.1f} MB/s)")
+
+def run_benchmark(endpoint_url: str, bucket: str, size_mb: int, files: int, chunk_mb: int, concurrency: int) -> None:
+    with s3_backend(endpoint_url), tempfile.TemporaryDirectory() as tmp_dir:
+        client = S3Client(S3Config(aws_access_key_id=os.environ.get('AWS_ACCESS_KEY_ID', 'test'),
+                                   aws_secret_access_key=os.environ.get('AWS_SECRET_ACCESS_KEY', 'test'),
+                                   region_name='us-east-1', endpoint_url=endpoint_url or None))
+        with contextlib.suppress(Exception):
+            client.s3.create_bucket(Bucket=bucket)
+        source = os.path.join(tmp_dir, 'source')
+        os.makedirs(source)
+        for i in range(files):
+            with open(os.path.join(source, f'part-{i}.bin'), 'wb') as file:
+                file.write(os.urandom(size_mb * MB))
+        settings = TransferSettings(multipart_threshold=chunk_mb * MB, multipart_chunksize=chunk_mb * MB,
+                                    max_concurrency=concurrency, max_files_in_flight=min(files, 4))
+        total = files * size_mb * MB
+        client.upload_directory(bucket, source, prefix='bench', settings=settings, skip_unchanged=False)
+
+        key = 'bench/part-0.bin'
+        timed('single GET', size_mb * MB,
+              lambda: client.download_file(bucket, key, os.path.join(tmp_dir, 'single.bin'), chunk_size=size_mb * MB, max_concurrency=1))
+        timed(f'ranged GET ({chunk_mb} MB x {concurrency})', size_mb * MB,
+              lambda: client.download_file(bucket, key, os.path.join(tmp_dir, 'ranged.bin'), chunk_size=chunk_mb * MB,
+                                           max_concurrency=concurrency))
+        timed(f'sync of {files} objects', total, lambda: client.sync_prefix(bucket, 'bench/', os.path.join(tmp_dir, 'mirror'), settings))
+        timed('sync again (all skipped)', total, lambda: client.sync_prefix(bucket, 'bench/', os.path.join(tmp_dir, 'mirror'), settings))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure S3 download, ranged download and sync throughput.")
+    parser.add_argument('--endpoint-url', help="S3-compatible endpoint, e.g. http://localhost:9000 for MinIO (default: moto)")
+    parser.add_argument('--bucket', default='bench-bucket', help="Bucket to use (created if missing)")
+    parser.add_argument('--size-mb', type=int, default=256, help="Size of each object")
+    parser.add_argument('--files', type=int, default=4, help="Objects to sync")
+    parser.add_argument('--chunk-mb', type=int, default=8, help="Range/part size")
+    parser.add_argument('--concurrency', type=int, default=8, help="Parallel ranges per object")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    run_benchmark(args.endpoint_url, args.bucket, args.size_mb, args.files, args.chunk_mb, args.concurrency)
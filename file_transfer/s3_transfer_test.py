@@ -0,0 +1,151 @@
+import unittest, hashlib, io, logging, os, tempfile
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from botocore.exceptions import ClientError
+try:
+    from moto import mock_aws
+except ImportError:
+    from moto import mock_s3 as mock_aws
+from s3_transfer import MB, S3Client, S3Config, S3MultipartWriter, TransferSettings, etag_matches, local_etag
+
+BUCKET = 'test-bucket'
+
+class TestS3Transfer(unittest.TestCase):
+
+    def setUp(self):
+        self.mock = mock_aws()
+        self.mock.start()
+        self.client = S3Client(S3Config(aws_access_key_id='test', aws_secret_access_key='test', region_name='us-east-1'))
+        self.client.s3.create_bucket(Bucket=BUCKET)
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.local_dir = self.tmp_dir.name
+        os.makedirs(os.path.join(self.local_dir, 'nested'))
+        self.files = {
+            'a.parquet': os.urandom(1024),
+            'nested/b.parquet': os.urandom(2048),
+            'large.parquet': os.urandom(11 * MB),
+        }
+        for name, content in self.files.items():
+            with open(os.path.join(self.local_dir, name), 'wb') as file:
+                file.write(content)
+        self.settings = TransferSettings(multipart_threshold=5 * MB, multipart_chunksize=5 * MB, max_concurrency=4)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+        self.mock.stop()
+
+    def test_upload_directory_uploads_every_file(self):
+        report = self.client.upload_directory(BUCKET, self.local_dir, prefix='partitions', settings=self.settings)
+        self.assertEqual(len(report.transferred), 3)
+        self.assertEqual(report.failed, [])
+        for name, content in self.files.items():
+            body = self.client.s3.get_object(Bucket=BUCKET, Key=f'partitions/{name}')['Body'].read()
+            self.assertEqual(body, content)
+
+    def test_multipart_etag_matches_local_etag(self):
+        self.client.upload_directory(BUCKET, self.local_dir, settings=self.settings)
+        head = self.client.s3.head_object(Bucket=BUCKET, Key='large.parquet')
+        self.assertTrue(head['ETag'].endswith('-3"'))
+        self.assertEqual(head['ETag'], local_etag(os.path.join(self.local_dir, 'large.parquet'), 5 * MB, 5 * MB))
+
+    def test_unchanged_files_are_skipped(self):
+        self.client.upload_directory(BUCKET, self.local_dir, settings=self.settings)
+        with open(os.path.join(self.local_dir, 'a.parquet'), 'wb') as file:
+            file.write(os.urandom(1024))
+        report = self.client.upload_directory(BUCKET, self.local_dir, settings=self.settings)
+        self.assertEqual(report.transferred, [os.path.join(self.local_dir, 'a.parquet')])
+        self.assertEqual(len(report.skipped), 2)
+
+    def read_back(self, key: str) -> pd.DataFrame:
+        body = self.client.s3.get_object(Bucket=BUCKET, Key=key)['Body'].read()
+        return pq.read_table(io.BytesIO(body)).to_pandas()
+
+    def test_write_parquet_dataframe_multipart(self):
+        df = pd.DataFrame({'id': np.arange(1_500_000), 'value': np.random.default_rng(0).random(1_500_000)})
+        size = self.client.write_parquet_to_s3(BUCKET, 'stream/data.parquet', df, part_size=5 * MB,
+                                               writer_options={'compression': 'none'})
+        head = self.client.s3.head_object(Bucket=BUCKET, Key='stream/data.parquet')
+        self.assertEqual(head['ContentLength'], size)
+        self.assertIn('-', head['ETag'])
+        pd.testing.assert_frame_equal(self.read_back('stream/data.parquet'), df)
+
+    def test_write_parquet_small_batches_single_put(self):
+        batches = (pa.record_batch({'id': pa.array(range(i, i + 10))}) for i in range(0, 100, 10))
+        self.client.write_parquet_to_s3(BUCKET, 'stream/small.parquet', batches)
+        self.assertEqual(self.read_back('stream/small.parquet')['id'].tolist(), list(range(100)))
+
+    def test_write_parquet_empty_inputs(self):
+        df = pd.DataFrame({'id': pd.Series(dtype='int64'), 'name': pd.Series(dtype='str')})
+        self.client.write_parquet_to_s3(BUCKET, 'stream/empty_df.parquet', df)
+        self.assertEqual(list(self.read_back('stream/empty_df.parquet').columns), ['id', 'name'])
+        self.assertEqual(len(self.read_back('stream/empty_df.parquet')), 0)
+        table = pa.table({'id': pa.array([], pa.int32())})
+        self.client.write_parquet_to_s3(BUCKET, 'stream/empty_table.parquet', table)
+        body = self.client.s3.get_object(Bucket=BUCKET, Key='stream/empty_table.parquet')['Body'].read()
+        self.assertEqual(pq.read_table(io.BytesIO(body)).schema, table.schema)
+
+    def test_failed_stream_aborts_upload(self):
+        with self.assertRaises(RuntimeError):
+            with S3MultipartWriter(self.client.s3, BUCKET, 'stream/aborted.bin', part_size=5 * MB) as sink:
+                sink.write(os.urandom(6 * MB))
+                raise RuntimeError("producer failed")
+        self.assertNotIn('Contents', self.client.s3.list_objects_v2(Bucket=BUCKET, Prefix='stream/aborted'))
+        self.assertEqual(self.client.s3.list_multipart_uploads(Bucket=BUCKET).get('Uploads', []), [])
+
+    def test_ranged_download_matches_object(self):
+        self.client.upload_directory(BUCKET, self.local_dir, settings=self.settings)
+        target = os.path.join(self.local_dir, 'download', 'large.parquet')
+        size = self.client.download_file(BUCKET, 'large.parquet', target, chunk_size=MB, max_concurrency=4)
+        self.assertEqual(size, 11 * MB)
+        with open(target, 'rb') as file:
+            self.assertEqual(file.read(), self.files['large.parquet'])
+
+    def test_download_fails_when_object_changes(self):
+        self.client.upload_directory(BUCKET, self.local_dir, settings=self.settings)
+        get_object = self.client.s3.get_object
+
+        def overwrite_then_get(**kwargs):
+            if kwargs['Range'].startswith('bytes=0-'):
+                self.client.s3.put_object(Bucket=BUCKET, Key='large.parquet', Body=os.urandom(11 * MB))
+            return get_object(**kwargs)
+
+        self.client.s3.get_object = overwrite_then_get
+        target = os.path.join(self.local_dir, 'download', 'large.parquet')
+        with self.assertRaises(ClientError) as raised:
+            self.client.download_file(BUCKET, 'large.parquet', target, chunk_size=MB, max_concurrency=1)
+        self.assertEqual(raised.exception.response['Error']['Code'], 'PreconditionFailed')
+        self.assertEqual(os.listdir(os.path.dirname(target)), [])
+
+    def test_etag_matches_any_candidate_part_size(self):
+        path = os.path.join(self.local_dir, 'large.parquet')
+        content = self.files['large.parquet']
+        self.assertTrue(etag_matches(path, f'"{hashlib.md5(content).hexdigest()}"'))
+        # 11 MB in 6 MB parts is 2 parts, like the default 8 MB, so both sizes are candidates
+        self.assertTrue(etag_matches(path, local_etag(path, 0, 6 * MB)))
+        self.assertTrue(etag_matches(path, local_etag(path, 0, 8 * MB)))
+        self.assertFalse(etag_matches(path, local_etag(path, 0, 5 * MB).replace('-3', '-2')))
+
+    def test_list_prefix_walks_nested_prefixes(self):
+        for key in ['p/a', 'p/x/b', 'p/x/y/c', 'p/z/d', 'other/e']:
+            self.client.s3.put_object(Bucket=BUCKET, Key=key, Body=b'data')
+        keys = [obj['Key'] for obj in self.client.list_prefix(BUCKET, 'p/', max_workers=3)]
+        self.assertEqual(keys, ['p/a', 'p/x/b', 'p/x/y/c', 'p/z/d'])
+
+    def test_sync_prefix_downloads_then_skips(self):
+        self.client.upload_directory(BUCKET, self.local_dir, prefix='mirror', settings=self.settings)
+        with tempfile.TemporaryDirectory() as target:
+            first = self.client.sync_prefix(BUCKET, 'mirror/', target, settings=self.settings)
+            self.assertEqual(len(first.transferred), 3)
+            self.assertTrue(etag_matches(os.path.join(target, 'large.parquet'),
+                                         self.client.s3.head_object(Bucket=BUCKET, Key='mirror/large.parquet')['ETag']))
+            with open(os.path.join(target, 'nested', 'b.parquet'), 'rb') as file:
+                self.assertEqual(file.read(), self.files['nested/b.parquet'])
+            second = self.client.sync_prefix(BUCKET, 'mirror/', target, settings=self.settings)
+            self.assertEqual(second.transferred, [])
+            self.assertEqual(len(second.skipped), 3)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    unittest.main()
@@ -0,0 +1,166 @@
+"""Minimal paramiko SSH/SFTP server serving a local directory, for tests and benchmarks."""
+import errno, os, socket, threading, time
+import paramiko
+from paramiko import SFTPAttributes, SFTPHandle, SFTPServer, SFTPServerInterface, ServerInterface
+from paramiko.sftp import SFTP_OK
+
+class StubServer(ServerInterface):
+    username = 'test_user'
+    password = 'test_pass'
+
+    def check_auth_password(self, username: str, password: str) -> int:
+        if (username, password) == (self.username, self.password):
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def get_allowed_auths(self, username: str) -> str:
+        return 'password'
+
+    def check_channel_request(self, kind: str, chanid: int) -> int:
+        return paramiko.OPEN_SUCCEEDED
+
+class StubSFTPHandle(SFTPHandle):
+    def stat(self):
+        return SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+
+    def write(self, offset, data):
+        fail_at = self.server_state.get('fail_at_offset')
+        if fail_at is not None and offset >= fail_at:
+            self.server_state['fail_at_offset'] = None
+            self.server_state['transport'].close()
+            return SFTPServer.convert_errno(errno.EIO)
+        slow = self.server_state.get('slow_writes')
+        if slow and slow[0] <= offset < slow[1]:
+            time.sleep(slow[2])
+        result = super().write(offset, data)
+        self.server_state['bytes_written'] += len(data)
+        fail_after = self.server_state.get('fail_after_bytes')
+        if fail_after is not None and self.server_state['bytes_written'] >= fail_after:
+            self.server_state['fail_after_bytes'] = None
+            self.server_state['transport'].close()
+        return result
+
+class StubSFTPServer(SFTPServerInterface):
+    root = '/'
+    state: dict = {}
+
+    def _path(self, path: str) -> str:
+        return os.path.join(self.root, self.canonicalize(path).lstrip('/'))
+
+    def list_folder(self, path):
+        local = self._path(path)
+        try:
+            return [SFTPAttributes.from_stat(os.stat(os.path.join(local, name)), name) for name in os.listdir(local)]
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+
+    def stat(self, path):
+        try:
+            return SFTPAttributes.from_stat(os.stat(self._path(path)))
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+
+    lstat = stat
+
+    def open(self, path, flags, attr):
+        local = self._path(path)
+        try:
+            fd = os.open(local, flags | getattr(os, 'O_BINARY', 0), 0o644)
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+        if flags & os.O_WRONLY:
+            mode = 'ab' if flags & os.O_APPEND else 'wb'
+        elif flags & os.O_RDWR:
+            mode = 'a+b' if flags & os.O_APPEND else 'r+b'
+        else:
+            mode = 'rb'
+        try:
+            file = os.fdopen(fd, mode)
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+        handle = StubSFTPHandle(flags)
+        handle.filename = local
+        handle.readfile = file
+        handle.writefile = file
+        handle.server_state = self.state
+        return handle
+
+    def remove(self, path):
+        try:
+            os.remove(self._path(path))
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+        return SFTP_OK
+
+    def rename(self, oldpath, newpath):
+        try:
+            os.rename(self._path(oldpath), self._path(newpath))
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+        return SFTP_OK
+
+    def posix_rename(self, oldpath, newpath):
+        try:
+            os.replace(self._path(oldpath), self._path(newpath))
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+        return SFTP_OK
+
+    def mkdir(self, path, attr):
+        try:
+            os.mkdir(self._path(path))
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+        return SFTP_OK
+
+    def rmdir(self, path):
+        try:
+            os.rmdir(self._path(path))
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+        return SFTP_OK
+
+class StubSFTPServerThread:
+    """
+    Serves root over SFTP on 127.0.0.1 with a random port. `state` counts bytes written and
+    injects faults: 'fail_after_bytes' drops the connection once that many bytes were received,
+    'fail_at_offset' drops it (without writing) on the first write at or past that offset and
+    'slow_writes' = (start, end, seconds) delays each write starting in [start, end).
+    """
+
+    host_key = None
+
+    def __init__(self, root: str):
+        if StubSFTPServerThread.host_key is None:
+            StubSFTPServerThread.host_key = paramiko.RSAKey.generate(2048)
+        self.state = {'bytes_written': 0, 'fail_after_bytes': None, 'fail_at_offset': None, 'slow_writes': None,
+                      'transport': None}
+        self.server_class = type('BoundStubSFTPServer', (StubSFTPServer,), {'root': root, 'state': self.state})
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind(('127.0.0.1', 0))
+        self.socket.listen(16)
+        self.port = self.socket.getsockname()[1]
+        self.transports = []
+        self.running = True
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def _serve(self) -> None:
+        while self.running:
+            try:
+                connection, _ = self.socket.accept()
+            except OSError:
+                return
+            transport = paramiko.Transport(connection)
+            transport.add_server_key(self.host_key)
+            transport.set_subsystem_handler('sftp', SFTPServer, self.server_class)
+            transport.start_server(server=StubServer())
+            self.state['transport'] = transport
+            self.transports.append(transport)
+
+    def stop(self) -> None:
+        self.running = False
+        self.socket.close()
+        for transport in self.transports:
+            transport.close()
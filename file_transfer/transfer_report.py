@@ -0,0 +1,17 @@
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+MB = 1024 * 1024
+
+@dataclass
+class TransferReport:
+    """Outcome of a batch transfer, shared by the S3 and FTP/SFTP clients."""
+    transferred: List[str] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+    failed: List[Tuple[str, str]] = field(default_factory=list)
+    bytes_transferred: int = 0
+    seconds: float = 0.0
+
+    @property
+    def throughput_mb_s(self) -> float:
+        return self.bytes_transferred / MB / self.seconds if self.seconds else 0.0
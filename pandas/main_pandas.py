@@ -1,7 +1,24 @@
 import re
 import pandas as pd
-import logging
+import pyarrow as pa
+import argparse, logging, os
+from concurrent.futures import ProcessPoolExecutor
 from typing import List, Optional, Union
+from common.parallel import bounded_map
+
+EMAIL_PATTERN = re.compile(r'([A-Za-z0-9]+)@([A-Za-z0-9]+)\.([A-Za-z0-9]+)')
+COLUMNS = ['p1', 'p2', 'p3']
+# Same pattern with named groups: pandas only hands str.extract to pyarrow's extract_regex for
+# ArrowDtype strings with named groups, otherwise it falls back to re on each element
+EMAIL_FIELDS_PATTERN = r'(?P<p1>[A-Za-z0-9]+)@(?P<p2>[A-Za-z0-9]+)\.(?P<p3>[A-Za-z0-9]+)'
+
+def extract_emails(data: pd.Series) -> pd.DataFrame:
+    """Vectorized equivalent of the per-row re.search loop, run by pyarrow's extract_regex."""
+    parts = data.astype(pd.ArrowDtype(pa.string())).str.extract(EMAIL_FIELDS_PATTERN)
+    return parts.dropna().reset_index(drop=True)
+
+def process_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    return extract_emails(chunk['data'])
 
 class Task:
         
@@ -20,15 +37,40 @@ class Task:
             if df is None or df.empty:
                 return pd.DataFrame()
             
-            email_pattern = re.compile(r'([A-Za-z0-9]+)@([A-Za-z0-9]+)\.([A-Za-z0-9]+)')
             processes_data: List[List[str]] = []
             
             for data in df['data']:
-                matcher = re.search(email_pattern, data)
+                matcher = EMAIL_PATTERN.search(data)
                 if matcher is not None:
                     p1, p2, p3 = matcher.groups()
                     processes_data.append([p1, p2, p3])
             return pd.DataFrame(processes_data,columns=['p1','p2','p3'])        
+
+    def process_vectorized(self, df: Optional[pd.DataFrame]) -> pd.DataFrame:
+        if df is None or df.empty:
+            return pd.DataFrame(columns=COLUMNS)
+        return extract_emails(df['data'])
+
+    def process_parallel(self, file_name: str, output_file: str, chunksize: int = 1_000_000,
+                         workers: Optional[int] = None) -> int:
+        """
+        Streams file_name in chunks through a process pool and appends results to output_file
+        in input order, keeping at most 2 * workers chunks in flight. Returns rows written.
+        """
+        workers = workers or os.cpu_count() or 1
+        written = 0
+        try:
+            with open(output_file, mode='w', newline='') as out, ProcessPoolExecutor(max_workers=workers) as executor:
+                pd.DataFrame(columns=COLUMNS).to_csv(out, index=False)
+                reader = pd.read_csv(file_name, chunksize=chunksize, usecols=['data'], dtype={'data': 'string[pyarrow]'})
+                for result in bounded_map(executor, process_chunk, ((chunk,) for chunk in reader), 2 * workers):
+                    result.to_csv(out, index=False, header=False)
+                    written += len(result)
+        except FileNotFoundError as e:
+            logging.error(f"File not found: {file_name}. Error: {e}")
+        except IOError as e:
+            logging.error(f"IOError occurred while processing the file: {file_name}. Error: {e}")
+        return written
         
     def load(self, file_name: str, df: pd.DataFrame) -> None:
         try:
@@ -38,8 +80,11 @@ class Task:
         except IOError as e:
             logging.error(f"IOError occurred while saving the file: {file_name}. Error: {e}")
 
-def run_task():
+def run_task(mode: str = 'loop', workers: Optional[int] = None, chunksize: int = 1_000_000):
     task = Task()
+    if mode == 'parallel':
+        task.process_parallel('./in.csv', './out_2.csv', chunksize=chunksize, workers=workers)
+        return 1
     result = task.read('./in.csv')
     
     match result:
@@ -47,7 +92,7 @@ def run_task():
             logging.error(e)
             return 0
         case pd.DataFrame() as df:
-            processes_df = task.process(df)
+            processes_df = task.process_vectorized(df) if mode == 'vectorized' else task.process(df)
             task.load('./out_2.csv', processes_df)
             return 1
         case _:
@@ -55,4 +100,10 @@ def run_task():
             return 0
     
 if __name__ == '__main__':
-    run_task()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Split email addresses into p1,p2,p3 CSV columns.")
+    parser.add_argument('--mode', choices=['loop', 'vectorized', 'parallel'], default='loop', help="Processing engine")
+    parser.add_argument('--workers', type=int, help="Worker processes for --mode parallel (default: all cores)")
+    parser.add_argument('--chunksize', type=int, default=1_000_000, help="Rows per chunk for --mode parallel")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    run_task(args.mode, args.workers, args.chunksize)
\ No newline at end of file
@@ -0,0 +1,45 @@
+import argparse, logging, os, tempfile, time
+import numpy as np
+import pandas as pd
+from main_pandas import Task
+
+def synthetic_emails(rows: int, invalid_ratio: float = 0.1) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    ids = np.arange(rows).astype(str)
+    domains = rng.choice(np.array(['email', 'mail', 'corp']), rows)
+    tlds = rng.choice(np.array(['ca', 'com', 'net']), rows)
+    data = np.char.add(np.char.add(np.char.add(np.char.add('user', ids), '@'), domains), np.char.add('.', tlds))
+    invalid = rng.random(rows) < invalid_ratio
+    data[invalid] = 'not an email'
+    return pd.DataFrame({'data': data})
+
+def timed(name: str, rows: int, func) -> None:
+    start_time = time.time()
+    result = func()
+    elapsed = time.time() - start_time
+    produced = result if isinstance(result, int) else len(result)
+    logging.info(f"{name}: {rows} rows in {elapsed:.2f} seconds ({rows / elapsed:,.0f} rows/sec, {produced} matches)")
+
+def run_benchmark(sizes, workers: int, chunksize: int, skip_loop_above: int) -> None:
+    task = Task()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for rows in sizes:
+            df = synthetic_emails(rows)
+            input_file = os.path.join(tmp_dir, f'in_{rows}.csv')
+            df.to_csv(input_file, index=False)
+            logging.info(f"--- {rows} rows ---")
+            if rows <= skip_loop_above:
+                timed('loop', rows, lambda: task.process(df))
+            timed('vectorized', rows, lambda: task.process_vectorized(df))
+            timed(f'parallel x{workers} (read + write)', rows,
+                  lambda: task.process_parallel(input_file, os.path.join(tmp_dir, 'out.csv'), chunksize, workers))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare loop, vectorized and parallel email extraction.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000_000, 10_000_000], help="Synthetic row counts")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Worker processes for the parallel variant")
+    parser.add_argument('--chunksize', type=int, default=1_000_000, help="Rows per chunk for the parallel variant")
+    parser.add_argument('--skip-loop-above', type=int, default=10_000_000, help="Largest size timed with the Python loop")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    run_benchmark(args.sizes, args.workers, args.chunksize, args.skip_loop_above)
@@ -1,40 +1,165 @@
 import pandas as pd
-import time
+import pyarrow as pa
+import pyarrow.parquet as pq
+import argparse, os, time
 import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from queue import Queue
+from typing import Iterator, List, Optional, Tuple
+from common.parallel import bounded_map
+from common.passenger_schema import PASSENGER_DTYPES, arrow_schema, pruned_columns, read_csv_options
 
-def extract(file_path: str, chunksize: int):
-    for chunk in pd.read_csv(file_path, chunksize=chunksize):
+# Dtypes of a cleaned chunk: clean_chunk() casts Age to int
+CLEANED_DTYPES = {**PASSENGER_DTYPES, 'Age': 'int64'}
+
+def extract(file_path: str, chunksize: int, typed: bool = True, columns: Optional[List[str]] = None):
+    for chunk in pd.read_csv(file_path, chunksize=chunksize, **read_csv_options(typed, columns)):
         yield chunk
 
-def process_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
-    start_time = time.time()
-    chunk_cleaned = chunk.dropna()
+def prefetch(chunks: Iterator[pd.DataFrame], depth: int = 1) -> Iterator[pd.DataFrame]:
+    """Reads up to `depth` chunks ahead on a background thread while the caller processes."""
+    queue: Queue = Queue(maxsize=depth)
+    done = object()
+
+    def produce():
+        try:
+            for chunk in chunks:
+                queue.put(chunk)
+        except Exception as e:
+            queue.put(e)
+        finally:
+            queue.put(done)
+
+    threading.Thread(target=produce, daemon=True).start()
+    while (item := queue.get()) is not done:
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+def clean_chunk(chunk: pd.DataFrame, null_check: Optional[List[str]] = None) -> pd.DataFrame:
+    """Drops rows with nulls in `null_check` (every column when None) and passengers aged 18 or under."""
+    chunk_cleaned = chunk.dropna(subset=null_check)
     chunk_cleaned['Age'] = chunk_cleaned['Age'].astype(int)
-    chunk_filtered = chunk_cleaned[chunk_cleaned['Age'] > 18]
+    return chunk_cleaned[chunk_cleaned['Age'] > 18]
+
+def process_chunk(chunk: pd.DataFrame, null_check: Optional[List[str]] = None) -> pd.DataFrame:
+    start_time = time.time()
+    chunk_filtered = clean_chunk(chunk, null_check)
     end_time = time.time()
     logging.info(f"Processed chunk in {end_time - start_time:.2f} seconds")
     return chunk_filtered
 
+def timed_clean_chunk(chunk: pd.DataFrame, null_check: Optional[List[str]] = None) -> Tuple[int, pd.DataFrame, float]:
+    """Worker entry point: returns the input rows, the cleaned chunk and the time spent cleaning it."""
+    start_time = time.time()
+    return len(chunk), clean_chunk(chunk, null_check), time.time() - start_time
+
+def process_chunks(chunks: Iterator[pd.DataFrame], workers: int = 1,
+                   null_check: Optional[List[str]] = None) -> Iterator[Tuple[int, pd.DataFrame]]:
+    """
+    Yields (input rows, processed chunk) in input order. With workers > 1 chunks are cleaned
+    in a process pool with at most 2 * workers chunks in flight, so reading applies
+    backpressure instead of buffering the whole file.
+    """
+    if workers <= 1:
+        for chunk_number, chunk in enumerate(chunks, start=1):
+            logging.info(f"Processing chunk {chunk_number}")
+            yield len(chunk), process_chunk(chunk, null_check)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = bounded_map(executor, timed_clean_chunk, ((chunk, null_check) for chunk in chunks), 2 * workers)
+        for chunk_number, (rows, processed, elapsed) in enumerate(results, start=1):
+            logging.info(f"Processed chunk {chunk_number} ({rows} rows) in {elapsed:.2f} seconds")
+            yield rows, processed
+
 def load(df: pd.DataFrame, output_file_path: str):
     df.to_csv(output_file_path, index=False)
 
-def process_small_csv(file_path: str, output_file_path: str, chunksize: int = 100000):
+class CsvSink:
+    """Appends chunks to one CSV file. The header is written up front, so it is there even with no chunks."""
+
+    def __init__(self, output_file_path: str, columns: List[str]):
+        self.columns = columns
+        self.file = open(output_file_path, mode='w', newline='')
+        pd.DataFrame(columns=columns).to_csv(self.file, index=False)
+
+    def write(self, df: pd.DataFrame) -> None:
+        df.to_csv(self.file, index=False, header=False, columns=self.columns)
+
+    def close(self) -> None:
+        self.file.close()
+
+class ParquetSink:
+    """
+    Writes each chunk as a row group of one Parquet file. The schema comes from the passenger
+    dtypes rather than the first chunk, whose inferred types may be null when it is empty.
+    """
+
+    def __init__(self, output_file_path: str, columns: List[str]):
+        self.dtypes = {name: dtype for name, dtype in CLEANED_DTYPES.items() if name in columns}
+        self.writer = pq.ParquetWriter(output_file_path, arrow_schema(self.dtypes))
+
+    def write(self, df: pd.DataFrame) -> None:
+        table = pa.Table.from_pandas(df.astype(self.dtypes), schema=self.writer.schema, preserve_index=False)
+        self.writer.write_table(table)
+
+    def close(self) -> None:
+        self.writer.close()
+
+SINKS = {'csv': CsvSink, 'parquet': ParquetSink}
+
+def process_small_csv(file_path: str, output_file_path: str, chunksize: int = 100000,
+                      sink: Optional[str] = None, overlap_read: bool = False, workers: int = 1,
+                      typed: bool = True, columns: Optional[List[str]] = None,
+                      null_check: Optional[List[str]] = None):
+    """
+    Cleans file_path chunk by chunk. Without a sink all chunks are concatenated and written
+    at the end; with `sink='csv'` or `'parquet'` each chunk is written as soon as it is
+    processed, so memory stays proportional to chunksize. `workers` > 1 cleans chunks in
+    a process pool. `typed` applies the declared passenger dtypes and `columns` prunes the
+    read. Rows with a null in `null_check` are dropped (every column read when None), so
+    prune with pruned_columns(null_check) to keep the output unchanged.
+    """
     start_time = time.time()
-    chunk_list = []
-    
-    for chunk_number, chunk in enumerate(extract(file_path, chunksize), start=1):
-        logging.info(f"Processing chunk {chunk_number}")
-        processed_chunk = process_chunk(chunk)
-        chunk_list.append(processed_chunk)
-    
-    final_df = pd.concat(chunk_list)
-    load(final_df, output_file_path)
-    
+    chunks = extract(file_path, chunksize, typed, columns)
+    if overlap_read:
+        chunks = prefetch(chunks)
+    total_rows = 0
+
+    if sink is None:
+        chunk_list = []
+        for rows, processed_chunk in process_chunks(chunks, workers, null_check):
+            total_rows += rows
+            chunk_list.append(processed_chunk)
+        final_df = pd.concat(chunk_list)
+        load(final_df, output_file_path)
+    else:
+        writer = SINKS[sink](output_file_path, columns or list(PASSENGER_DTYPES))
+        try:
+            for rows, processed_chunk in process_chunks(chunks, workers, null_check):
+                total_rows += rows
+                writer.write(processed_chunk)
+        finally:
+            writer.close()
+
     end_time = time.time()
-    logging.info(f"Processed large CSV file in {end_time - start_time:.3f} seconds")
+    elapsed = end_time - start_time
+    logging.info(f"Processed large CSV file in {elapsed:.3f} seconds ({total_rows / elapsed:,.0f} rows/sec)")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clean the passenger CSV in chunks.")
+    parser.add_argument('--input', default='small_dataset.csv', help="Input CSV file")
+    parser.add_argument('--output', default='processed_dataset_pandas.csv', help="Output file")
+    parser.add_argument('--chunksize', type=int, default=100000, help="Rows per chunk")
+    parser.add_argument('--sink', choices=sorted(SINKS), help="Stream each chunk to a CSV or Parquet sink")
+    parser.add_argument('--workers', type=int, default=1, help=f"Worker processes (this machine has {os.cpu_count()} cores)")
+    parser.add_argument('--untyped', action='store_true', help="Let read_csv infer dtypes instead of the passenger schema")
+    parser.add_argument('--prune', action='store_true', help="Only read the columns the transform and the null check use")
+    parser.add_argument('--null-check', nargs='+', help="Only drop rows with nulls in these columns (default: all; changes the output)")
+    parser.add_argument('--overlap-read', action='store_true', help="Read the next chunk on a background thread")
+    args = parser.parse_args()
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-    input_file = 'small_dataset.csv'
-    output_file = 'processed_dataset_pandas.csv'
-    process_small_csv(input_file, output_file)
\ No newline at end of file
+    process_small_csv(args.input, args.output, args.chunksize, args.sink, args.overlap_read, args.workers,
+                      typed=not args.untyped, columns=pruned_columns(args.null_check) if args.prune else None,
+                      null_check=args.null_check)
@@ -1,11 +1,13 @@
 import requests, logging, os, json
 import pandas as pd
 from typing import Optional
+from common.http_fetch import FetchConfig, FetchError, fetch_dataframe
+from common.columnar_decode import columnar_decoder, decode_columns
 data = []
 
 def request_data(url: str) -> Optional[requests.Response]:
     try:
-        response = requests.get(url)
+        response = requests.get(url, timeout=30)
         logging.debug(f"status_code: {response.status_code}, body: {response.json}")
         response.raise_for_status()
         return response
@@ -17,18 +19,26 @@ def request_data(url: str) -> Optional[requests.Response]:
         logging.error(f'Unknown error: {e}')
 
 def process_response(response: requests.Response) -> pd.DataFrame:
-    data = response.json()
-    if not data:
-        logging.info("json is empty")
-        return pd.DataFrame()
-    df = pd.DataFrame(data)
     try:
-        logging.info(f"columns: {df.columns}")
-        filtered_df: pd.DataFrame = df[df['userId'] == 1]
-        return filtered_df
+        df = decode_columns(response.content, equals={'userId': 1})
     except Exception as e:
         logging.error(f"Processing error: {e}")
-    return pd.DataFrame()
+        return pd.DataFrame()
+    if df.empty:
+        logging.info("json is empty")
+    return df
+
+def fetch_posts(url: str, config: FetchConfig = FetchConfig()) -> Optional[pd.DataFrame]:
+    """Fetches every page of url concurrently, keeping userId == 1 rows while decoding."""
+    try:
+        df = fetch_dataframe(url, config, decode=columnar_decoder(equals={'userId': 1}))
+    except FetchError as e:
+        logging.error(f'HTTP request error: {e}')
+        return None
+    if df.empty:
+        logging.info("json is empty")
+        return df
+    return df.sort_values('id')
         
 def handle_response(response: Optional[requests.Response]) -> Optional[pd.DataFrame]:
     match response:
@@ -41,8 +51,8 @@ def store_data(df: pd.DataFrame):
     json_output = df.to_json('./out_3.json',orient='records', indent=4)
 
 if __name__ == "__main__":
-    response = request_data(url='https://jsonplaceholder.typicode.com/posts')
-    returned_df = handle_response(response)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    returned_df = fetch_posts(url='https://jsonplaceholder.typicode.com/posts')
     match returned_df:
         case pd.DataFrame() as res:
             store_data(res)
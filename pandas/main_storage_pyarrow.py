@@ -1,40 +1,317 @@
 import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
 import pyarrow.parquet as pq
 import pandas as pd
+import base64
+import json
+import math
 import os
+import threading
+import time
 import uuid
 import shutil
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+Filters = Union[ds.Expression, List[Tuple[str, str, Any]], List[List[Tuple[str, str, Any]]]]
+
+MANIFEST_FILE = '_manifest.json'
+TEMP_PREFIX = '.tmp-'
+
+"""
+Parquet writer settings shared by partition writes, merges and compactions.
+
+Args:
+    compression (str): Codec, e.g. 'snappy', 'zstd', 'gzip' or 'none'.
+    compression_level (int): Codec level, e.g. 1-22 for zstd; codec default if None.
+    use_dictionary: True/False, or the list of columns to dictionary-encode.
+    write_statistics: True/False, or the list of columns to keep min/max statistics for.
+    sort_by: [('column', 'ascending'|'descending')] applied before writing. Clustering a
+        column makes its row-group min/max ranges narrow, so equality and range filters skip
+        most row groups (the effect a bloom filter would give for point lookups).
+    row_group_size (int): Maximum rows per row group.
+"""
+@dataclass(frozen=True)
+class WriteOptions:
+    compression: str = 'snappy'
+    compression_level: Optional[int] = None
+    use_dictionary: Union[bool, List[str]] = True
+    write_statistics: Union[bool, List[str]] = True
+    sort_by: Optional[List[Tuple[str, str]]] = None
+    row_group_size: Optional[int] = None
+
+    def writer_kwargs(self) -> Dict[str, Any]:
+        return {
+            'compression': self.compression,
+            'compression_level': self.compression_level,
+            'use_dictionary': self.use_dictionary,
+            'write_statistics': self.write_statistics,
+        }
+
+    def write_table(self, table: pa.Table, file_path: str) -> None:
+        if self.sort_by:
+            table = table.sort_by(self.sort_by)
+        pq.write_table(table, file_path, row_group_size=self.row_group_size, **self.writer_kwargs())
+
+"""
+Merge schemas, promoting compatible types (e.g. int32 + int64 -> int64, null -> any type)
+and adding columns that only some inputs have.
+"""
+def unify_schemas(schemas: List[pa.Schema]) -> pa.Schema:
+    schemas = [schema.remove_metadata() for schema in schemas]
+    try:
+        return pa.unify_schemas(schemas, promote_options='permissive')
+    except TypeError:
+        # pyarrow < 14 has no promote_options and only merges null types.
+        return pa.unify_schemas(schemas)
+
+"""
+Reorder, cast and null-fill a table's columns so it matches schema exactly.
+Raises pa.ArrowInvalid if a column cannot be cast.
+"""
+def conform_table(table: pa.Table, schema: pa.Schema) -> pa.Table:
+    columns = [
+        table.column(field.name).cast(field.type) if field.name in table.column_names
+        else pa.nulls(table.num_rows, type=field.type)
+        for field in schema
+    ]
+    return pa.Table.from_arrays(columns, schema=schema)
+
+"""
+Convert a DataFrame without its pandas index, conformed to schema when one is pinned.
+"""
+def table_from_pandas(df: pd.DataFrame, schema: Optional[pa.Schema] = None) -> pa.Table:
+    table = pa.Table.from_pandas(df, preserve_index=False).replace_schema_metadata(None)
+    return conform_table(table, schema) if schema is not None else table
+
+def encode_schema(schema: pa.Schema) -> str:
+    return base64.b64encode(schema.serialize().to_pybytes()).decode('ascii')
+
+def decode_schema(encoded: str) -> pa.Schema:
+    return pa.ipc.read_schema(pa.py_buffer(base64.b64decode(encoded)))
 
 """
 Write new data to a partitioned Parquet file.
 """
-def create_partition_parquet(new_data: pd.DataFrame, partition_dir: str):
+def create_partition_parquet(new_data: pd.DataFrame, partition_dir: str, schema: Optional[pa.Schema] = None,
+                             options: WriteOptions = WriteOptions()):
     os.makedirs(partition_dir, exist_ok=True)
     unique_id = uuid.uuid4().hex
     temp_file = os.path.join(partition_dir, f'{unique_id}.parquet')
-    new_table = pa.Table.from_pandas(new_data)
-    pq.write_table(new_table, temp_file)
+    new_table = table_from_pandas(new_data, schema)
+    options.write_table(new_table, temp_file)
     print(f'New partition created: {temp_file}')
 
+"""
+Stream the record batches of several Parquet files into one file, holding a single batch
+in memory at a time. Inputs are conformed to their unified schema (or to `schema` when
+given). The output is written to a temporary name and atomically renamed.
+"""
+def merge_parquet_files(input_files: List[str], file_path: str, batch_size: int = 64_000,
+                        schema: Optional[pa.Schema] = None, options: WriteOptions = WriteOptions()) -> int:
+    if not input_files:
+        return 0
+    schema = schema or unify_schemas([pq.read_schema(f) for f in input_files])
+    directory = os.path.dirname(os.path.abspath(file_path))
+    temp_file = os.path.join(directory, f'{TEMP_PREFIX}{uuid.uuid4().hex}.parquet')
+    rows = 0
+    writer: Optional[pq.ParquetWriter] = None
+    try:
+        writer = pq.ParquetWriter(temp_file, schema, **options.writer_kwargs())
+        for input_file in input_files:
+            parquet_file = pq.ParquetFile(input_file)
+            for batch in parquet_file.iter_batches(batch_size=batch_size):
+                writer.write_table(conform_table(pa.Table.from_batches([batch]), schema), row_group_size=options.row_group_size)
+                rows += batch.num_rows
+        writer.close()
+        writer = None
+        os.replace(temp_file, file_path)
+    finally:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+    return rows
+
 """
 Combine all partition files into a single Parquet file.
 """
 def combine_partitions_to_parquet(file_path: str, partition_dir: str):
-    all_files = [os.path.join(partition_dir, f) for f in os.listdir(partition_dir) if f.endswith('.parquet')]
+    all_files = [os.path.join(partition_dir, f) for f in os.listdir(partition_dir) if f.endswith('.parquet') and not f.startswith(TEMP_PREFIX)]
     
     if not all_files:
         print('No partition files to combine.')
         return
     
-    tables = [pq.read_table(f) for f in all_files]
-    combined_table = pa.concat_tables(tables)
-    
-    pq.write_table(combined_table, file_path)
+    merge_parquet_files(all_files, file_path)
     print(f'Combined data written to {file_path}')
     
     for file in all_files:
         os.remove(file)
 
+"""
+Append-only Parquet dataset with size-tiered compaction.
+
+Every data file is listed in a JSON manifest that is replaced atomically, and readers only
+open files named by the manifest, so they see either the files before a compaction or the
+file after it, never a mix. New and compacted files are written under a temporary name and
+renamed into place before the manifest references them. Files replaced by a compaction are
+not deleted right away: the manifest lists them as retired, and vacuum() removes them once
+they have been retired longer than a grace period, so readers that loaded an older manifest
+can still open them. A single writer process per directory is assumed.
+
+Args:
+    root (str): Dataset directory.
+    target_file_size (int): Compaction stops merging once an output would exceed this size.
+    fanout (int): Files per size tier that trigger a compaction of that tier.
+    tier_base (int): Upper bound, in bytes, of the smallest tier.
+    schema (pa.Schema): Pinned dataset schema; appends that cannot be cast to it fail. When
+        None the schema is taken from the first append and widened as later appends add
+        columns or wider types. Either way it is stored in the manifest.
+    options (WriteOptions): Encoding, compression and statistics settings for every write.
+"""
+class ParquetDatasetManager:
+
+    def __init__(self, root: str, target_file_size: int = 128 * 1024 * 1024, fanout: int = 4,
+                 tier_base: int = 1024 * 1024, schema: Optional[pa.Schema] = None,
+                 options: WriteOptions = WriteOptions()):
+        self.root = root
+        self.target_file_size = target_file_size
+        self.fanout = fanout
+        self.tier_base = tier_base
+        self.pinned_schema = schema
+        self.options = options
+        self.lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def manifest(self) -> Dict:
+        """Current manifest: a version counter and the list of live files."""
+        path = os.path.join(self.root, MANIFEST_FILE)
+        if not os.path.exists(path):
+            return {'version': 0, 'files': []}
+        with open(path) as fs:
+            return json.load(fs)
+
+    def files(self) -> List[str]:
+        return [os.path.join(self.root, entry['name']) for entry in self.manifest()['files']]
+
+    def schema(self) -> Optional[pa.Schema]:
+        """The dataset schema: pinned, or as recorded by the manifest."""
+        if self.pinned_schema is not None:
+            return self.pinned_schema
+        encoded = self.manifest().get('schema')
+        return decode_schema(encoded) if encoded else None
+
+    def _commit(self, added: List[Dict], removed: List[str], schema: Optional[pa.Schema] = None,
+                purged: List[str] = ()) -> None:
+        """Writes the next manifest: `removed` files become retired, `purged` retired files are dropped."""
+        manifest = self.manifest()
+        version = manifest['version'] + 1
+        removed_names = set(removed)
+        purged_names = set(purged)
+        files = [entry for entry in manifest['files'] if entry['name'] not in removed_names] + added
+        retired = [entry for entry in manifest.get('retired', []) if entry['name'] not in purged_names]
+        retired += [{'name': name, 'version': version, 'retired_at': time.time()} for name in removed]
+        encoded = encode_schema(schema) if schema is not None else manifest.get('schema')
+        temp_path = os.path.join(self.root, f'{TEMP_PREFIX}{uuid.uuid4().hex}.json')
+        with open(temp_path, 'w') as fs:
+            json.dump({'version': version, 'schema': encoded, 'files': files, 'retired': retired}, fs)
+            fs.flush()
+            os.fsync(fs.fileno())
+        os.replace(temp_path, os.path.join(self.root, MANIFEST_FILE))
+
+    def _entry(self, name: str) -> Dict:
+        path = os.path.join(self.root, name)
+        return {'name': name, 'rows': pq.ParquetFile(path).metadata.num_rows, 'bytes': os.path.getsize(path)}
+
+    def append(self, new_data: pd.DataFrame) -> str:
+        """Writes new_data as a new file and registers it in the manifest."""
+        name = f'{uuid.uuid4().hex}.parquet'
+        temp_file = os.path.join(self.root, TEMP_PREFIX + name)
+        with self.lock:
+            table = table_from_pandas(new_data)
+            schema = self.schema()
+            if self.pinned_schema is None:
+                schema = unify_schemas([schema, table.schema]) if schema is not None else table.schema
+            table = conform_table(table, schema)
+            self.options.write_table(table, temp_file)
+            os.replace(temp_file, os.path.join(self.root, name))
+            self._commit([self._entry(name)], [], schema)
+        return os.path.join(self.root, name)
+
+    def _tier(self, size: int) -> int:
+        return max(0, math.floor(math.log(max(size, 1) / self.tier_base, self.fanout)) + 1)
+
+    def plan_compactions(self) -> List[List[str]]:
+        """Groups of file names to merge: tiers holding at least `fanout` files below the target size."""
+        tiers: Dict[int, List[Dict]] = {}
+        for entry in self.manifest()['files']:
+            if entry['bytes'] < self.target_file_size:
+                tiers.setdefault(self._tier(entry['bytes']), []).append(entry)
+        groups = []
+        for entries in tiers.values():
+            if len(entries) < self.fanout:
+                continue
+            group: List[str] = []
+            group_bytes = 0
+            for entry in sorted(entries, key=lambda e: e['bytes']):
+                if group and group_bytes + entry['bytes'] > self.target_file_size:
+                    if len(group) > 1:
+                        groups.append(group)
+                    group, group_bytes = [], 0
+                group.append(entry['name'])
+                group_bytes += entry['bytes']
+            if len(group) > 1:
+                groups.append(group)
+        return groups
+
+    def compact(self) -> int:
+        """
+        Runs every planned compaction and returns the number of files replaced. The replaced
+        files stay on disk as retired until vacuum() removes them.
+        """
+        replaced = 0
+        with self.lock:
+            for group in self.plan_compactions():
+                name = f'{uuid.uuid4().hex}.parquet'
+                merge_parquet_files([os.path.join(self.root, f) for f in group], os.path.join(self.root, name),
+                                    schema=self.schema(), options=self.options)
+                self._commit([self._entry(name)], group)
+                replaced += len(group)
+                print(f'Compacted {len(group)} files into {name}')
+        return replaced
+
+    def vacuum(self, grace_period: float = 3600.0) -> int:
+        """
+        Deletes files retired more than grace_period seconds ago, plus temporary files and data
+        files the manifest doesn't know about (left by a crash). The grace period must exceed
+        the longest read, since a reader may still hold a manifest listing retired files.
+        Returns the number of retired files deleted.
+        """
+        with self.lock:
+            manifest = self.manifest()
+            cutoff = time.time() - grace_period
+            expired = [entry['name'] for entry in manifest.get('retired', []) if entry['retired_at'] <= cutoff]
+            if expired:
+                self._commit([], [], purged=expired)
+                for name in expired:
+                    path = os.path.join(self.root, name)
+                    if os.path.exists(path):
+                        os.remove(path)
+            known = {entry['name'] for entry in manifest['files'] + manifest.get('retired', [])}
+            for name in os.listdir(self.root):
+                if name.startswith(TEMP_PREFIX) or (name.endswith('.parquet') and name not in known):
+                    os.remove(os.path.join(self.root, name))
+        return len(expired)
+
+    def read(self, columns: Optional[List[str]] = None, filters: Optional[Filters] = None) -> pd.DataFrame:
+        """Reads a consistent snapshot: the files listed by one manifest version."""
+        files = self.files()
+        if not files:
+            return pd.DataFrame()
+        return read_parquet(files, columns=columns, filters=filters, schema=self.schema())
+
 """
 Delete a directory and its contents.
 """
@@ -53,19 +330,59 @@ def delete_directory(directory: str):
         print(f'Directory {directory} does not exist.')
 
 
+"""
+Open one or more Parquet files as a pyarrow dataset, optionally through memory maps.
+"""
+def open_dataset(file_path: Union[str, List[str]], memory_map: bool = True, schema: Optional[pa.Schema] = None) -> ds.Dataset:
+    return ds.dataset(file_path, format='parquet', filesystem=pafs.LocalFileSystem(use_mmap=memory_map), schema=schema)
+
+"""
+Convert filters given as (column, op, value) tuples, or lists of them (OR of ANDs),
+into a dataset expression. Expressions are passed through unchanged.
+"""
+def to_expression(filters: Optional[Filters]) -> Optional[ds.Expression]:
+    if filters is None or isinstance(filters, ds.Expression):
+        return filters
+    return pq.filters_to_expression(filters)
+
 """
 Read a Parquet file into a Pandas DataFrame.
 
+Only the requested columns are decoded, filters are pushed into the scan so row groups
+whose statistics cannot match are skipped, and the Arrow table is released block by block
+while converting.
+
 Args:
-    file_path (str): Path to the Parquet file.
+    file_path (str): Path to the Parquet file (or a list of files).
+    columns (List[str]): Columns to read, all if None.
+    filters: pyarrow expression or [('col', '>', 18)] style tuples.
+    memory_map (bool): Read through a memory map instead of buffered reads.
+    arrow_dtypes (bool): Keep Arrow-backed pandas dtypes (pd.ArrowDtype) instead of numpy ones.
+    schema (pa.Schema): Read every file as this schema (older files get nulls for new columns).
     
 Returns:
     pd.DataFrame: DataFrame containing the data from the Parquet file.
 """
-def read_parquet(file_path: str) -> pd.DataFrame:
-    table = pq.read_table(file_path)
-    df = table.to_pandas()
-    return df
+def read_parquet(file_path: Union[str, List[str]], columns: Optional[List[str]] = None, filters: Optional[Filters] = None,
+                 memory_map: bool = True, arrow_dtypes: bool = False, schema: Optional[pa.Schema] = None) -> pd.DataFrame:
+    dataset = open_dataset(file_path, memory_map, schema)
+    table = dataset.to_table(columns=columns, filter=to_expression(filters))
+    return table.to_pandas(
+        self_destruct=True,
+        split_blocks=True,
+        types_mapper=pd.ArrowDtype if arrow_dtypes else None
+    )
+
+"""
+Iterate over a Parquet file as DataFrames of at most batch_size rows, with the same
+projection and filter pushdown as read_parquet.
+"""
+def iter_parquet_batches(file_path: Union[str, List[str]], columns: Optional[List[str]] = None,
+                         filters: Optional[Filters] = None, batch_size: int = 64_000, memory_map: bool = True,
+                         arrow_dtypes: bool = False) -> Iterator[pd.DataFrame]:
+    dataset = open_dataset(file_path, memory_map)
+    for batch in dataset.to_batches(columns=columns, filter=to_expression(filters), batch_size=batch_size):
+        yield batch.to_pandas(types_mapper=pd.ArrowDtype if arrow_dtypes else None)
 
 """
 Example function to demonstrate usage of partitioned Parquet files.
@@ -80,6 +397,15 @@ def pyarrow_example():
     combine_partitions_to_parquet('./data.parquet', 'partitions')
     df: pd.DataFrame = read_parquet('./data.parquet')
     print(df)
+
+    dataset = ParquetDatasetManager('./dataset', fanout=2)
+    dataset.append(new_data1)
+    dataset.append(new_data2)
+    dataset.compact()
+    print(dataset.read())
+    # Nothing reads the example dataset concurrently, so retired files can go at once
+    dataset.vacuum(grace_period=0)
+    print(read_parquet('./data.parquet', columns=['A'], filters=[('B', '>', 3)]))
     
 
 if __name__ == '__main__':
@@ -0,0 +1,50 @@
+import argparse, logging, os, tempfile, time
+import numpy as np
+import pandas as pd
+from main_storage_pyarrow import WriteOptions, read_parquet, table_from_pandas
+
+SETTINGS = {
+    'snappy': WriteOptions(),
+    'snappy, no dictionary': WriteOptions(use_dictionary=False),
+    'zstd level 1': WriteOptions(compression='zstd', compression_level=1),
+    'zstd level 9': WriteOptions(compression='zstd', compression_level=9),
+    'zstd 9, stats on userId only': WriteOptions(compression='zstd', compression_level=9, write_statistics=['userId']),
+    'zstd 9, sorted by userId': WriteOptions(compression='zstd', compression_level=9, sort_by=[('userId', 'ascending')]),
+}
+
+def synthetic_posts(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'id': np.arange(rows, dtype=np.int64),
+        'userId': rng.integers(1, 10_000, rows, dtype=np.int32),
+        'status': rng.choice(np.array(['draft', 'published', 'archived']), rows),
+        'score': rng.random(rows),
+        'title': [f"title {i % 5000}" for i in range(rows)],
+    })
+
+def timed(func) -> float:
+    start_time = time.time()
+    func()
+    return time.time() - start_time
+
+def run_benchmark(rows: int, row_group_size: int) -> None:
+    table = table_from_pandas(synthetic_posts(rows))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, options in SETTINGS.items():
+            options = WriteOptions(**{**options.__dict__, 'row_group_size': row_group_size})
+            path = os.path.join(tmp_dir, 'bench.parquet')
+            write_time = timed(lambda: options.write_table(table, path))
+            scan_time = timed(lambda: read_parquet(path))
+            filter_time = timed(lambda: read_parquet(path, filters=[('userId', '==', 42)]))
+            logging.info(
+                f"{name}: {os.path.getsize(path) / 2**20:.1f} MiB, write {write_time:.2f}s, "
+                f"full scan {scan_time:.2f}s, userId == 42 scan {filter_time:.3f}s"
+            )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare Parquet file size and scan speed across writer settings.")
+    parser.add_argument('--rows', type=int, default=5_000_000, help="Rows in the synthetic table")
+    parser.add_argument('--row-group-size', type=int, default=250_000, help="Rows per row group")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    run_benchmark(args.rows, args.row_group_size)
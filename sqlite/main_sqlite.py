@@ -1,22 +1,65 @@
-import requests, logging, os, json, argparse, sys
-from typing import Optional
-from sqlalchemy import create_engine, Column, Integer, String, text
+import requests, logging, os, argparse, sys
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+from dataclasses import dataclass
+from sqlalchemy import create_engine, event, func, select, Column, Integer, String
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 import pandas as pd
+from common.http_fetch import FetchConfig, FetchError, fetch_dataframe
+from common.columnar_decode import columnar_decoder, decode_columns
 
 Base = declarative_base()
-session: Session
+SessionFactory: sessionmaker
+USER_COLUMNS = ['id', 'userId', 'title', 'body']
+DEFAULT_BATCH_SIZE = 10_000
+# Values bound per IN (...) lookup, under SQLite's bound-parameter limit
+PARAMETER_BATCH_SIZE = 900
+
+@dataclass(frozen=True)
+class EngineProfile:
+    """SQLite PRAGMAs applied on every new connection, plus pool sizing."""
+    journal_mode: str = 'DELETE'
+    synchronous: str = 'FULL'
+    mmap_size: int = 0
+    cache_size: int = -2000
+    page_size: int = 4096
+    echo: bool = False
+    pool_size: int = 5
+    max_overflow: int = 10
+
+ENGINE_PROFILES: Dict[str, EngineProfile] = {
+    'default': EngineProfile(),
+    # page_size only applies to a new database file (or after VACUUM), so it is set before journal_mode.
+    'tuned': EngineProfile(
+        journal_mode='WAL',
+        synchronous='NORMAL',
+        mmap_size=256 * 1024 * 1024,
+        cache_size=-64_000,
+        page_size=8192
+    ),
+}
+
 class User(Base):
     __tablename__ = 'users'
     id = Column(Integer, primary_key=True)
-    userId = Column(Integer)
+    userId = Column(Integer, index=True)
     title = Column(String)
     body = Column(String)
 
-def request_data(url: str) -> Optional[requests.Response]:
+class SyncState(Base):
+    __tablename__ = 'sync_state'
+    source_url = Column(String, primary_key=True)
+    etag = Column(String)
+    last_modified = Column(String)
+    synced_at = Column(String)
+
+def request_data(url: str, headers: Optional[Dict[str, str]] = None) -> Optional[requests.Response]:
     try:
-        response = requests.get(url)
+        response = requests.get(url, headers=headers, timeout=30)
         response.raise_for_status()
         logging.debug(f"status_code: {response.status_code}, body: {response.json}")
         return response
@@ -28,17 +71,16 @@ def request_data(url: str) -> Optional[requests.Response]:
         logging.error(f'Unknown error: {e}')
 
 def process_response(response: requests.Response) -> pd.DataFrame:
-    data = response.json()
-    if not data:
-        logging.info("json is empty")
-        return pd.DataFrame()
     try:
-        df = pd.DataFrame(data)
-        logging.info(f"columns: {df.columns}")
-        return df
+        df = decode_columns(response.content)
     except Exception as e:
         logging.error(f"Processing error: {e}")
-    return pd.DataFrame()
+        return pd.DataFrame()
+    if df.empty:
+        logging.info("json is empty")
+        return pd.DataFrame()
+    logging.info(f"columns: {df.columns}")
+    return df
         
 def handle_response(response: Optional[requests.Response]) -> Optional[pd.DataFrame]:
     match response:
@@ -47,6 +89,16 @@ def handle_response(response: Optional[requests.Response]) -> Optional[pd.DataFr
         case _:
             logging.error("failed request")
 
+def fetch_posts(url: str, config: FetchConfig = FetchConfig()) -> Optional[pd.DataFrame]:
+    """Fetches every page of url concurrently into one DataFrame."""
+    try:
+        df = fetch_dataframe(url, config, decode=columnar_decoder())
+    except FetchError as e:
+        logging.error(f'HTTP request error: {e}')
+        return None
+    logging.info(f"columns: {df.columns}")
+    return df
+
 def load(session, df: pd.DataFrame) -> None:
     try:
         with session.begin():
@@ -63,41 +115,234 @@ def load(session, df: pd.DataFrame) -> None:
     except Exception as e:
         print(f"An error occurred: {e}")
         session.rollback()  
+
+def iter_batches(df: pd.DataFrame, batch_size: int):
+    """Yields lists of row dicts built from the DataFrame's column arrays."""
+    columns = [df[column].tolist() for column in USER_COLUMNS]
+    for start in range(0, len(df), batch_size):
+        stop = start + batch_size
+        yield [dict(zip(USER_COLUMNS, values)) for values in zip(*(column[start:stop] for column in columns))]
+
+def bulk_load(session, df: pd.DataFrame, batch_size: int = DEFAULT_BATCH_SIZE, update: bool = False) -> int:
+    """Set-based upsert of the DataFrame using INSERT ... ON CONFLICT in executemany batches."""
+    if df.empty:
+        return 0
+    stmt = insert(User.__table__)
+    if update:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[User.id],
+            set_={column: stmt.excluded[column] for column in USER_COLUMNS if column != 'id'}
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=[User.id])
+    written = 0
+    try:
+        with session.begin():
+            for batch in iter_batches(df, batch_size):
+                session.execute(stmt, batch)
+                written += len(batch)
+                logging.debug(f"Upserted {written}/{len(df)} rows")
+    except Exception as e:
+        logging.error(f"Bulk load failed: {e}")
+        session.rollback()
+        return 0
+    return written
         
-def store_data(df: pd.DataFrame) -> bool:
+def load_known_ids(session) -> Set[int]:
+    """Reads the users primary key index once into an in-memory id set."""
+    return set(session.scalars(select(User.id)))
+
+def changed_rows(session, df: pd.DataFrame, known_ids: Set[int], batch_size: int = PARAMETER_BATCH_SIZE) -> pd.DataFrame:
+    """Returns the rows of df that are new or differ from what is stored."""
+    is_new = ~df['id'].isin(known_ids)
+    existing = df.loc[~is_new, USER_COLUMNS]
+    if existing.empty:
+        return df.loc[is_new, USER_COLUMNS]
+    ids = existing['id'].tolist()
+    # Lookups are batched to stay under SQLite's bound-parameter limit.
+    stored = pd.concat([
+        pd.DataFrame.from_records(
+            session.execute(select(User.id, User.userId, User.title, User.body).where(User.id.in_(ids[start:start + batch_size]))),
+            columns=USER_COLUMNS
+        )
+        for start in range(0, len(ids), batch_size)
+    ])
+    merged = existing.merge(stored, on='id', how='left', suffixes=('', '_stored'))
+    differs = pd.Series(False, index=merged.index)
+    for column in USER_COLUMNS[1:]:
+        differs |= (merged[column] != merged[f'{column}_stored']).fillna(True).astype(bool)
+    return pd.concat([df.loc[is_new, USER_COLUMNS], merged.loc[differs, USER_COLUMNS]])
+
+def sync_users(url: str, batch_size: int = DEFAULT_BATCH_SIZE) -> Optional[int]:
+    """Conditionally fetches url and upserts only new or changed rows, returning how many were written."""
+    with SessionFactory() as session:
+        with session.begin():
+            state = session.get(SyncState, url)
+            headers = {}
+            if state is not None and state.etag:
+                headers['If-None-Match'] = state.etag
+            if state is not None and state.last_modified:
+                headers['If-Modified-Since'] = state.last_modified
+        response = request_data(url, headers=headers)
+        if response is None:
+            logging.error("failed request")
+            return None
+        if response.status_code == 304:
+            logging.info(f"{url} not modified since last sync")
+            return 0
+        df = process_response(response)
+        written = 0
+        if not df.empty:
+            with session.begin():
+                rows = changed_rows(session, df, load_known_ids(session))
+            logging.info(f"{len(rows)} of {len(df)} rows are new or changed")
+            written = bulk_load(session, rows, batch_size=batch_size, update=True)
+            if written != len(rows):
+                # Keep the previous validators so the next run fetches this payload again.
+                return None
+        with session.begin():
+            session.merge(SyncState(
+                source_url=url,
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified'),
+                synced_at=datetime.now(timezone.utc).isoformat()
+            ))
+        return written
+
+def create_profiled_engine(db_url: str, profile: EngineProfile) -> Engine:
+    """Creates a pooled engine whose connections are configured with the profile's PRAGMAs."""
+    engine = create_engine(
+        db_url,
+        echo=profile.echo,
+        poolclass=QueuePool,
+        pool_size=profile.pool_size,
+        max_overflow=profile.max_overflow,
+        connect_args={'check_same_thread': False}
+    )
+
+    @event.listens_for(engine, 'connect')
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA page_size={profile.page_size}")
+        cursor.execute(f"PRAGMA journal_mode={profile.journal_mode}")
+        cursor.execute(f"PRAGMA synchronous={profile.synchronous}")
+        cursor.execute(f"PRAGMA mmap_size={profile.mmap_size}")
+        cursor.execute(f"PRAGMA cache_size={profile.cache_size}")
+        cursor.close()
+
+    return engine
+
+def stream_users(columns: Optional[List[str]] = None, user_ids: Optional[Iterable[int]] = None,
+                 chunksize: int = DEFAULT_BATCH_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Yields the users table as DataFrame chunks of at most chunksize rows. More user_ids than
+    fit in one IN (...) are bounded by a userId range in SQL and filtered per chunk instead.
+    """
+    columns = columns or USER_COLUMNS
+    unknown = set(columns) - set(USER_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown users columns: {sorted(unknown)}")
+    selected = [getattr(User, column) for column in columns]
+    wanted: Optional[List[int]] = None
+    if user_ids is not None:
+        user_ids = sorted(set(user_ids))
+        if len(user_ids) <= PARAMETER_BATCH_SIZE:
+            condition = User.userId.in_(user_ids)
+        else:
+            wanted = user_ids
+            selected.append(User.userId.label('_userId'))
+            condition = User.userId.between(user_ids[0], user_ids[-1])
+    query = select(*selected).order_by(User.id)
+    if user_ids is not None:
+        query = query.where(condition)
+    with SessionFactory() as session:
+        result = session.execute(query.execution_options(stream_results=True, max_row_buffer=chunksize))
+        for partition in result.partitions(chunksize):
+            if wanted is None:
+                yield pd.DataFrame.from_records(partition, columns=columns)
+                continue
+            chunk = pd.DataFrame.from_records(partition, columns=columns + ['_userId'])
+            chunk = chunk[chunk['_userId'].isin(wanted)].drop(columns='_userId').reset_index(drop=True)
+            if not chunk.empty:
+                yield chunk
+
+def export_users(file_name: str, columns: Optional[List[str]] = None, user_ids: Optional[Iterable[int]] = None,
+                 chunksize: int = DEFAULT_BATCH_SIZE) -> int:
+    """Writes the users table to CSV one chunk at a time and returns the number of rows written."""
+    written = 0
     try:
-        query = text(f"select * from users;")
-        load(session, df)
+        with open(file_name, mode='w', newline='') as file:
+            for chunk in stream_users(columns=columns, user_ids=user_ids, chunksize=chunksize):
+                chunk.to_csv(file, index=False, header=written == 0)
+                written += len(chunk)
+        logging.info(f"Exported {written} rows to {file_name}")
+    except IOError as e:
+        logging.error(f"IOError occurred while writing the file: {file_name}. Error: {e}")
+    return written
+
+def store_data(df: pd.DataFrame, bulk: bool = False, batch_size: int = DEFAULT_BATCH_SIZE, update: bool = False) -> bool:
+    session = SessionFactory()
+    try:
+        if bulk:
+            # bulk_load rolls back and returns 0 rows on error, after logging it
+            if bulk_load(session, df, batch_size=batch_size, update=update) != len(df):
+                return False
+        else:
+            load(session, df)
         with session.begin():
-            result = session.execute(query)
-            print("RESULT")
-            for row in result:
-                logging.debug(f"userId: {row.userId}, id: {row.id}")
+            count = session.execute(select(func.count()).select_from(User)).scalar()
+            logging.info(f"users table holds {count} rows")
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            for chunk in stream_users(columns=['id', 'userId'], chunksize=batch_size):
+                for user_id, id in zip(chunk['userId'], chunk['id']):
+                    logging.debug(f"userId: {user_id}, id: {id}")
         return True
     finally:
         session.close()
     return False
     
-def init(debug: bool = False):
-    global session
+def init(debug: bool = False, profile: str = 'tuned', db_url: str = 'sqlite:///example.db') -> sessionmaker:
+    global SessionFactory
     log_level = logging.DEBUG if debug else logging.INFO
     logging.basicConfig(level=log_level, format='%(asctime)s - %(levelname)s - %(message)s')
-    engine = create_engine('sqlite:///example.db', echo=True)
+    engine = create_profiled_engine(db_url, ENGINE_PROFILES[profile])
     Base.metadata.create_all(engine)
+    # create_all skips tables that already exist, and with them any index added since
+    for index in User.__table__.indexes:
+        index.create(engine, checkfirst=True)
     SessionFactory = sessionmaker(bind=engine)
-    session = SessionFactory()    
+    return SessionFactory
     
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="A script for loading data with SQLAlchemy.")
     parser.add_argument('--debug', action='store_true', help="Enable debug logging")
+    parser.add_argument('--bulk', action='store_true', help="Use set-based INSERT ... ON CONFLICT upserts")
+    parser.add_argument('--update', action='store_true', help="Update existing rows on conflict (with --bulk)")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="Rows per executemany batch")
+    parser.add_argument('--profile', choices=sorted(ENGINE_PROFILES), default='tuned', help="SQLite engine profile")
+    parser.add_argument('--concurrency', type=int, default=8, help="Concurrent page requests for the full fetch")
+    parser.add_argument('--incremental', action='store_true', help="Conditional fetch and write only new or changed rows")
+    parser.add_argument('--export', help="Stream the users table to this CSV file after loading")
+    parser.add_argument('--columns', nargs='+', choices=USER_COLUMNS, help="Columns to export (with --export)")
+    parser.add_argument('--user-ids', nargs='+', type=int, help="Only export posts of these userIds (with --export)")
     args = parser.parse_args()
-    init(debug=args.debug)
-    response = request_data(url='https://jsonplaceholder.typicode.com/posts')
-    returned_df = handle_response(response)
+    init(debug=args.debug, profile=args.profile)
+    url = 'https://jsonplaceholder.typicode.com/posts'
+    if args.incremental:
+        if sync_users(url, batch_size=args.batch_size) is None:
+            sys.exit(-1)
+        if args.export:
+            export_users(args.export, columns=args.columns, user_ids=args.user_ids, chunksize=args.batch_size)
+        sys.exit(0)
+    returned_df = fetch_posts(url, FetchConfig(concurrency=args.concurrency))
     match returned_df:
         case pd.DataFrame() as res:
-            if store_data(res):
+            if store_data(res, bulk=args.bulk, batch_size=args.batch_size, update=args.update):
                 logging.info("Sucessfully stored data.")
+            else:
+                sys.exit(-1)
+            if args.export:
+                export_users(args.export, columns=args.columns, user_ids=args.user_ids, chunksize=args.batch_size)
         case _:
             sys.exit(-1)
             
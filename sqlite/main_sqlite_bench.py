@@ -0,0 +1,99 @@
+import argparse, logging, os, tempfile, time
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+from main_sqlite import Base, load, bulk_load, create_profiled_engine, DEFAULT_BATCH_SIZE, ENGINE_PROFILES, EngineProfile
+
+def synthetic_users(rows: int) -> pd.DataFrame:
+    ids = np.arange(1, rows + 1)
+    return pd.DataFrame({
+        'id': ids,
+        'userId': ids % 1000 + 1,
+        'title': [f"title {i}" for i in ids],
+        'body': [f"body of post {i}" for i in ids],
+    })
+
+def fresh_session(db_path: str, profile: EngineProfile = ENGINE_PROFILES['default']):
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    engine = create_profiled_engine(f'sqlite:///{db_path}', profile)
+    Base.metadata.create_all(engine)
+    return engine, sessionmaker(bind=engine)()
+
+def time_path(name: str, db_path: str, df: pd.DataFrame, loader, profile: EngineProfile = ENGINE_PROFILES['default'],
+              seed: Optional[pd.DataFrame] = None) -> float:
+    """Times loader on a fresh database, first filled with `seed` (untimed) when given."""
+    engine, session = fresh_session(db_path, profile)
+    try:
+        if seed is not None:
+            bulk_load(session, seed)
+        start_time = time.time()
+        loader(session, df)
+        elapsed = time.time() - start_time
+    finally:
+        session.close()
+        engine.dispose()
+    rate = len(df) / elapsed if elapsed else float('inf')
+    logging.info(f"{name}: {len(df)} rows in {elapsed:.2f} seconds ({rate:,.0f} rows/sec)")
+    return rate
+
+def time_reads(name: str, db_path: str, profile: EngineProfile, readers: int, rounds: int) -> float:
+    engine = create_profiled_engine(f'sqlite:///{db_path}', profile)
+    factory = sessionmaker(bind=engine)
+
+    def read_all(_) -> int:
+        with factory() as session:
+            return sum(1 for _ in session.execute(text("select id, userId from users")))
+
+    try:
+        start_time = time.time()
+        with ThreadPoolExecutor(max_workers=readers) as executor:
+            total = sum(executor.map(read_all, range(readers * rounds)))
+        elapsed = time.time() - start_time
+    finally:
+        engine.dispose()
+    rate = total / elapsed if elapsed else float('inf')
+    logging.info(f"{name}: read {total} rows with {readers} readers in {elapsed:.2f} seconds ({rate:,.0f} rows/sec)")
+    return rate
+
+def run_profile_benchmark(rows: int, batch_size: int, readers: int, rounds: int) -> None:
+    df = synthetic_users(rows)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, profile in ENGINE_PROFILES.items():
+            db_path = os.path.join(tmp_dir, f'{name}.db')
+            time_path(f'[{name}] bulk insert', db_path, df,
+                      lambda s, d: bulk_load(s, d, batch_size=batch_size), profile)
+            time_reads(f'[{name}] concurrent read', db_path, profile, readers, rounds)
+
+def run_benchmark(rows: int, legacy_rows: int, batch_size: int) -> None:
+    df = synthetic_users(rows)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'bench.db')
+        # The per-row path is O(n) round trips, so it is timed on a prefix and compared by rate.
+        legacy_rate = time_path('iterrows + query/add', db_path, df.head(legacy_rows), load)
+        bulk_rate = time_path(f'bulk upsert (batch={batch_size})', db_path, df,
+                              lambda s, d: bulk_load(s, d, batch_size=batch_size))
+        # Seeded with an older version of every row, so each insert conflicts and updates
+        stale = df.assign(title=df['title'] + ' (old)')
+        update_rate = time_path(f'bulk upsert on conflict update (batch={batch_size})', db_path, df,
+                                lambda s, d: bulk_load(s, d, batch_size=batch_size, update=True), seed=stale)
+    logging.info(f"Speedup: {bulk_rate / legacy_rate:.1f}x (do nothing), {update_rate / legacy_rate:.1f}x (update)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare per-row and bulk loading of the users table.")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="Rows in the synthetic User table")
+    parser.add_argument('--legacy-rows', type=int, default=50_000, help="Rows timed on the per-row path")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="Rows per executemany batch")
+    parser.add_argument('--profiles', action='store_true', help="Measure insert/read throughput per engine profile")
+    parser.add_argument('--readers', type=int, default=4, help="Concurrent reader threads (with --profiles)")
+    parser.add_argument('--rounds', type=int, default=3, help="Full-table reads per reader (with --profiles)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.profiles:
+        run_profile_benchmark(args.rows, args.batch_size, args.readers, args.rounds)
+    else:
+        run_benchmark(args.rows, args.legacy_rows, args.batch_size)